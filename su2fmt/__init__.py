@@ -1,3 +1,8 @@
-from su2fmt.parser import parse_mesh, combine_meshes
+from su2fmt.parser import parse_mesh, parse_cell_blocks, read_points, read_elements, load_coordinates, combine_meshes
 from su2fmt.exporter import export_mesh
 from su2fmt.types import SU2ElementType
+from su2fmt.boundary import get_boundary_faces, check_marker_coverage, add_boundary_marker, MarkerCoverage
+from su2fmt.cell_blocks import CellBlocks
+from su2fmt.diff import diff_meshes, get_topology_hash, MeshDiff
+from su2fmt.renumber import renumber_vertices
+from su2fmt.spatial import MarkerIndex, NearestFaces, get_marker_index
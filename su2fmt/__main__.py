@@ -0,0 +1,4 @@
+import sys
+from su2fmt.cli import main
+
+sys.exit(main())
@@ -0,0 +1,241 @@
+"""Boundary face detection for volume (and planar) meshes."""
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+import numpy as np
+import numpy.typing as npt
+from meshly import Mesh, VTKCellType
+
+# Local faces of each volume cell type in VTK (= SU2) node ordering, normals pointing outwards
+VOLUME_CELL_FACES: Dict[int, List[Tuple[int, ...]]] = {
+    VTKCellType.VTK_TETRA: [(0, 1, 3), (1, 2, 3), (2, 0, 3), (0, 2, 1)],
+    VTKCellType.VTK_HEXAHEDRON: [
+        (0, 4, 7, 3), (1, 2, 6, 5), (0, 1, 5, 4),
+        (3, 7, 6, 2), (0, 3, 2, 1), (4, 5, 6, 7),
+    ],
+    VTKCellType.VTK_WEDGE: [(0, 1, 2), (3, 5, 4), (0, 3, 4, 1), (1, 4, 5, 2), (2, 5, 3, 0)],
+    VTKCellType.VTK_PYRAMID: [(0, 3, 2, 1), (0, 1, 4), (1, 2, 4), (2, 3, 4), (3, 0, 4)],
+}
+
+# Local edges of each planar cell type, used as boundary "faces" of 2D meshes
+SURFACE_CELL_EDGES: Dict[int, List[Tuple[int, ...]]] = {
+    VTKCellType.VTK_TRIANGLE: [(0, 1), (1, 2), (2, 0)],
+    VTKCellType.VTK_QUAD: [(0, 1), (1, 2), (2, 3), (3, 0)],
+}
+
+FACE_SIZE_TO_VTK = {
+    2: VTKCellType.VTK_LINE,
+    3: VTKCellType.VTK_TRIANGLE,
+    4: VTKCellType.VTK_QUAD,
+}
+
+
+@dataclass
+class MarkerCoverage:
+    """Result of comparing the markers of a mesh against its boundary faces."""
+    num_boundary_faces: int
+    # boundary faces not referenced by any marker, flattened like meshly markers
+    missing_indices: npt.NDArray[np.uint32]
+    missing_sizes: npt.NDArray[np.uint32]
+    # number of marker faces per tag that are not boundary faces of the cells
+    extra_faces: Dict[str, int]
+    # number of boundary faces referenced by more than one marker face
+    duplicate_faces: int
+
+    @property
+    def is_exact(self) -> bool:
+        """Whether the markers cover every boundary face exactly once."""
+        return len(self.missing_sizes) == 0 and self.duplicate_faces == 0 and not any(self.extra_faces.values())
+
+
+def get_cell_connectivity(mesh: Mesh, vtk_type: int) -> npt.NDArray[np.uint32]:
+    """Get the connectivity of all cells of a VTK type as a (n_cells, n_verts) array."""
+    if mesh.indices is None or mesh.cell_types is None or mesh.index_sizes is None:
+        return np.empty((0, 0), dtype=np.uint32)
+    cell_types = np.asarray(mesh.cell_types)
+    index_sizes = np.asarray(mesh.index_sizes, dtype=np.int64)
+    mask = cell_types == vtk_type
+    if not mask.any():
+        return np.empty((0, 0), dtype=np.uint32)
+    offsets = np.cumsum(index_sizes) - index_sizes
+    num_vertices = int(index_sizes[mask][0])
+    starts = offsets[mask]
+    return np.asarray(mesh.indices)[starts[:, None] + np.arange(num_vertices)]
+
+
+def _get_cell_faces(mesh: Mesh) -> Dict[int, List[Tuple[npt.NDArray[np.uint32], npt.NDArray[np.int64]]]]:
+    """Collect per face size the candidate faces as (connectivity, local face pattern) blocks."""
+    cell_types = set(np.unique(np.asarray(mesh.cell_types)).tolist()) if mesh.cell_types is not None else set()
+    face_table = VOLUME_CELL_FACES if cell_types & set(VOLUME_CELL_FACES) else SURFACE_CELL_EDGES
+
+    blocks: Dict[int, List[Tuple[npt.NDArray[np.uint32], npt.NDArray[np.int64]]]] = {}
+    for vtk_type, faces in face_table.items():
+        if vtk_type not in cell_types:
+            continue
+        connectivity = get_cell_connectivity(mesh, vtk_type)
+        for face in faces:
+            blocks.setdefault(len(face), []).append((connectivity, np.array(face, dtype=np.int64)))
+    return blocks
+
+
+def _sorted_rows(rows: npt.NDArray) -> npt.NDArray[np.int64]:
+    """Get the permutation that sorts rows lexicographically (first column most significant)."""
+    return np.lexsort(rows.T[::-1])
+
+
+def _same_as_previous(sorted_rows: npt.NDArray) -> npt.NDArray[np.bool_]:
+    """Flag rows equal to their predecessor, comparing one column at a time to bound memory."""
+    same = np.zeros(len(sorted_rows), dtype=bool)
+    if len(sorted_rows) < 2:
+        return same
+    same[1:] = sorted_rows[1:, 0] == sorted_rows[:-1, 0]
+    for column in range(1, sorted_rows.shape[1]):
+        same[1:] &= sorted_rows[1:, column] == sorted_rows[:-1, column]
+    return same
+
+
+def _find_boundary_faces(connectivity_blocks: List[Tuple[npt.NDArray[np.uint32], npt.NDArray[np.int64]]]):
+    """Find faces of one face size that belong to exactly one cell, keeping their orientation."""
+    block_sizes = np.array([len(connectivity) for connectivity, _ in connectivity_blocks], dtype=np.int64)
+    block_starts = np.cumsum(block_sizes) - block_sizes
+
+    # each face is stored with its vertices sorted so shared faces hash identically
+    keys = np.empty((int(block_sizes.sum()), len(connectivity_blocks[0][1])), dtype=np.uint32)
+    for block_start, (connectivity, face) in zip(block_starts, connectivity_blocks):
+        block_keys = keys[block_start:block_start + len(connectivity)]
+        block_keys[:] = connectivity[:, face]
+        block_keys.sort(axis=1)
+    order = _sorted_rows(keys)
+    keys = keys[order]
+    same = _same_as_previous(keys)
+
+    unique = ~same
+    unique[:-1] &= ~same[1:]
+    face_ids = order[unique]
+    face_order = np.argsort(face_ids)
+    face_ids = face_ids[face_order]
+    boundary_keys = keys[unique][face_order]
+    del keys, order, same
+
+    # map concatenated face ids back to the cells of their block to recover orientation
+    block_ids = np.searchsorted(block_starts, face_ids, side="right") - 1
+    faces = np.empty((len(face_ids), len(connectivity_blocks[0][1])), dtype=np.uint32)
+    for block_id, (connectivity, face) in enumerate(connectivity_blocks):
+        mask = block_ids == block_id
+        faces[mask] = connectivity[face_ids[mask] - block_starts[block_id]][:, face]
+    return faces, boundary_keys
+
+
+def get_boundary_faces(mesh: Mesh) -> Dict[int, npt.NDArray[np.uint32]]:
+    """
+    Get the boundary faces of the highest dimensional cells of a mesh.
+
+    Faces shared by two cells are interior; faces referenced once are boundary faces.
+    Returns a mapping of face size to a (n_faces, face_size) array of outward oriented faces.
+    For 2D meshes the boundary "faces" are the edges of the triangles and quadrilaterals.
+    """
+    boundary_faces = {}
+    for face_size, connectivity_blocks in sorted(_get_cell_faces(mesh).items()):
+        faces, _ = _find_boundary_faces(connectivity_blocks)
+        boundary_faces[face_size] = faces
+    return boundary_faces
+
+
+def _get_marker_faces(mesh: Mesh) -> Dict[int, Tuple[npt.NDArray[np.uint32], npt.NDArray[np.int64]]]:
+    """Get the sorted marker faces per face size along with the index of their marker."""
+    marker_faces: Dict[int, List[npt.NDArray[np.uint32]]] = {}
+    marker_ids: Dict[int, List[npt.NDArray[np.int64]]] = {}
+    for marker_id, (marker_tag, marker_indices) in enumerate(mesh.markers.items()):
+        marker_indices = np.asarray(marker_indices)
+        sizes = np.asarray(mesh.marker_sizes[marker_tag], dtype=np.int64)
+        offsets = np.cumsum(sizes) - sizes
+        for face_size in np.unique(sizes).tolist():
+            starts = offsets[sizes == face_size]
+            faces = np.sort(marker_indices[starts[:, None] + np.arange(face_size)], axis=1)
+            marker_faces.setdefault(face_size, []).append(faces)
+            marker_ids.setdefault(face_size, []).append(np.full(len(faces), marker_id, dtype=np.int64))
+    return {
+        face_size: (np.concatenate(marker_faces[face_size]), np.concatenate(marker_ids[face_size]))
+        for face_size in marker_faces
+    }
+
+
+def check_marker_coverage(mesh: Mesh) -> MarkerCoverage:
+    """Check that the markers of a mesh cover its boundary faces exactly."""
+    marker_tags = list(mesh.markers.keys())
+    marker_faces = _get_marker_faces(mesh)
+    cell_faces = _get_cell_faces(mesh)
+
+    extra_counts = np.zeros(len(marker_tags), dtype=np.int64)
+    missing_faces: List[npt.NDArray[np.uint32]] = []
+    num_boundary_faces = 0
+    duplicate_faces = 0
+
+    for face_size in sorted(set(cell_faces) | set(marker_faces)):
+        if face_size in cell_faces:
+            faces, boundary_keys = _find_boundary_faces(cell_faces[face_size])
+        else:
+            faces = boundary_keys = np.empty((0, face_size), dtype=np.uint32)
+        num_boundary_faces += len(faces)
+        keys, ids = marker_faces.get(face_size, (np.empty((0, face_size), dtype=np.uint32), np.empty(0, dtype=np.int64)))
+
+        # sort boundary and marker faces together, a boundary key is covered if a marker key follows it
+        num_boundary = len(boundary_keys)
+        rows = np.concatenate([boundary_keys.astype(keys.dtype, copy=False), keys])
+        order = _sorted_rows(rows)
+        same = _same_as_previous(rows[order])
+        group = np.cumsum(~same) - 1
+        is_boundary = order < num_boundary
+
+        num_groups = int(group[-1]) + 1 if len(group) else 0
+        boundary_in_group = np.bincount(group[is_boundary], minlength=num_groups) > 0
+        markers_in_group = np.bincount(group[~is_boundary], minlength=num_groups)
+
+        covered = np.zeros(num_boundary, dtype=bool)
+        covered[order[is_boundary]] = markers_in_group[group[is_boundary]] > 0
+        duplicate_faces += int(np.sum(markers_in_group[boundary_in_group] > 1))
+
+        extra = ~boundary_in_group[group[~is_boundary]]
+        extra_ids = ids[order[~is_boundary] - num_boundary][extra]
+        extra_counts += np.bincount(extra_ids, minlength=len(marker_tags))
+
+        missing_faces.append(faces[~covered])
+
+    missing = [faces for faces in missing_faces if len(faces)]
+    return MarkerCoverage(
+        num_boundary_faces=num_boundary_faces,
+        missing_indices=np.concatenate([faces.ravel() for faces in missing]) if missing else np.array([], dtype=np.uint32),
+        missing_sizes=np.concatenate([np.full(len(faces), faces.shape[1], dtype=np.uint32) for faces in missing]) if missing else np.array([], dtype=np.uint32),
+        extra_faces={marker_tag: int(count) for marker_tag, count in zip(marker_tags, extra_counts)},
+        duplicate_faces=duplicate_faces,
+    )
+
+
+def add_boundary_marker(mesh: Mesh, marker_tag: str = "unassigned") -> Mesh:
+    """
+    Add a marker holding every boundary face not already covered by an existing marker.
+
+    Meshes without any markers get a single marker for the whole boundary.
+    """
+    if marker_tag in mesh.markers:
+        raise ValueError(f"Marker '{marker_tag}' already exists")
+    coverage = check_marker_coverage(mesh)
+    markers = dict(mesh.markers)
+    marker_sizes = dict(mesh.marker_sizes)
+    marker_cell_types = dict(mesh.marker_cell_types)
+    if len(coverage.missing_sizes) > 0:
+        markers[marker_tag] = coverage.missing_indices
+        marker_sizes[marker_tag] = coverage.missing_sizes
+        face_size_to_vtk = np.zeros(max(FACE_SIZE_TO_VTK) + 1, dtype=np.uint8)
+        face_size_to_vtk[list(FACE_SIZE_TO_VTK)] = list(FACE_SIZE_TO_VTK.values())
+        marker_cell_types[marker_tag] = face_size_to_vtk[coverage.missing_sizes]
+
+    return Mesh(
+        vertices=mesh.vertices,
+        indices=mesh.indices,
+        index_sizes=mesh.index_sizes,
+        cell_types=mesh.cell_types,
+        markers=markers,
+        marker_sizes=marker_sizes,
+        marker_cell_types=marker_cell_types,
+        dim=mesh.dim,
+    )
@@ -0,0 +1,221 @@
+"""Cells grouped by element type, sharing memory with VTK style connectivity arrays."""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import numpy.typing as npt
+from meshly import Mesh
+from su2fmt.types import SU2ElementType, SU2_ELEMENT_VERTEX_COUNT, SU2_TO_VTK_MAPPING, VTK_TO_SU2_MAPPING
+
+# meshio cell type names of each SU2 element type
+SU2_TO_MESHIO_MAPPING = {
+    SU2ElementType.LINE: "line",
+    SU2ElementType.TRIANGLE: "triangle",
+    SU2ElementType.QUADRILATERAL: "quad",
+    SU2ElementType.TETRAHEDRON: "tetra",
+    SU2ElementType.HEXAHEDRON: "hexahedron",
+    SU2ElementType.PRISM: "wedge",
+    SU2ElementType.PYRAMID: "pyramid",
+}
+
+CellBlockDict = Dict[SU2ElementType, npt.NDArray[np.integer]]
+
+
+def get_cell_id_dtype(num_cells: int) -> np.dtype:
+    """Get the smallest signed integer dtype that can number num_cells cells."""
+    return np.dtype(np.int32) if num_cells <= np.iinfo(np.int32).max else np.dtype(np.int64)
+
+
+def get_type_order(types: npt.NDArray[np.integer]) -> Optional[npt.NDArray[np.signedinteger]]:
+    """
+    Get the stable order that groups cells by ascending type, or None if they are grouped already.
+
+    Counting sort over the few element types, so no int64 index per cell is needed as with np.argsort.
+    """
+    if (types[1:] >= types[:-1]).all():
+        return None
+    cell_ids = np.empty(len(types), dtype=get_cell_id_dtype(len(types)))
+    start = 0
+    for cell_type in np.flatnonzero(np.bincount(types)):
+        type_cell_ids = np.flatnonzero(types == cell_type)
+        cell_ids[start:start + len(type_cell_ids)] = type_cell_ids
+        start += len(type_cell_ids)
+    return cell_ids
+
+
+def get_block_views(
+    connectivity: npt.NDArray[np.integer], block_types: npt.NDArray[np.integer], block_counts: npt.NDArray[np.integer]
+) -> CellBlockDict:
+    """Get one (n_cells, n_verts) view per SU2 element type into a connectivity grouped in ascending type order."""
+    blocks: CellBlockDict = {}
+    offset = 0
+    for block_type, block_count in zip(block_types, block_counts):
+        block_size = SU2_ELEMENT_VERTEX_COUNT[int(block_type)]
+        blocks[SU2ElementType(int(block_type))] = connectivity[offset:offset + int(block_count) * block_size].reshape(int(block_count), block_size)
+        offset += int(block_count) * block_size
+    return blocks
+
+
+def group_cells(
+    types: npt.NDArray[np.integer],
+    starts: npt.NDArray[np.int64],
+    values: npt.NDArray[np.integer],
+) -> Tuple[npt.NDArray[np.integer], CellBlockDict, Optional[npt.NDArray[np.signedinteger]]]:
+    """
+    Group cells by SU2 element type into one contiguous connectivity array.
+
+    Cell i of SU2 type types[i] has its vertices at values[starts[i]:starts[i] + vertex count].
+    Returns the connectivity, one (n_cells, n_verts) view into it per element type in ascending
+    type order, and the original cell index of every grouped cell, None if cells are sorted by type.
+    Cells that are sorted by type and laid out back to back already are grouped without copying,
+    values is the connectivity.
+    """
+    cell_ids = get_type_order(types)
+    is_sorted = cell_ids is None
+    block_types, block_starts, block_counts = np.unique(types if cell_ids is None else types[cell_ids], return_index=True, return_counts=True)
+    block_sizes = np.array([SU2_ELEMENT_VERTEX_COUNT[int(block_type)] for block_type in block_types], dtype=np.int64)
+
+    cell_sizes = np.repeat(block_sizes, block_counts)
+    num_values = int(cell_sizes.sum())
+    is_grouped = is_sorted and len(values) == num_values and (starts == np.cumsum(cell_sizes) - cell_sizes).all()
+    connectivity = np.ascontiguousarray(values) if is_grouped else np.empty(num_values, dtype=values.dtype)
+    blocks = get_block_views(connectivity, block_types, block_counts)
+    if not is_grouped:
+        for block, block_start, block_count in zip(blocks.values(), block_starts, block_counts):
+            block_cell_ids = slice(block_start, block_start + block_count) if cell_ids is None else cell_ids[block_start:block_start + block_count]
+            block_cell_starts = starts[block_cell_ids]
+            np.take(values, block_cell_starts[:, None] + np.arange(block.shape[1]), out=block)
+    return connectivity, blocks, cell_ids
+
+
+@dataclass
+class CellBlocks:
+    """
+    Cells of a zone grouped by SU2 element type.
+
+    Every block is a (n_cells, n_verts) view into the single connectivity array, so the
+    connectivity doubles as the VTK connectivity array without copies.
+    """
+    vertices: npt.NDArray[np.float64]
+    connectivity: npt.NDArray[np.integer]
+    blocks: CellBlockDict
+    # original (file order) index of each cell in block order, None if the cells were sorted by type, see get_cell_ids
+    cell_ids: Optional[npt.NDArray[np.signedinteger]] = None
+    dim: int = 3
+    markers: Dict[str, CellBlockDict] = field(default_factory=dict)
+
+    @property
+    def cell_count(self) -> int:
+        return sum(len(block) for block in self.blocks.values())
+
+    def get_cell_ids(self) -> npt.NDArray[np.signedinteger]:
+        """Get the original index of each cell in block order, creating the identity order for sorted cells."""
+        if self.cell_ids is None:
+            return np.arange(self.cell_count, dtype=get_cell_id_dtype(self.cell_count))
+        return self.cell_ids
+
+    @property
+    def vtk_cell_types(self) -> npt.NDArray[np.uint8]:
+        """VTK cell type of each cell in block order."""
+        return np.repeat(
+            np.array([SU2_TO_VTK_MAPPING[block_type.value] for block_type in self.blocks], dtype=np.uint8),
+            [len(block) for block in self.blocks.values()],
+        )
+
+    @property
+    def vtk_offsets(self) -> npt.NDArray[np.int64]:
+        """VTK offsets of each cell into the connectivity, with the total length appended."""
+        sizes = np.repeat(
+            [block.shape[1] for block in self.blocks.values()],
+            [len(block) for block in self.blocks.values()],
+        ).astype(np.int64)
+        return np.concatenate(([0], np.cumsum(sizes)))
+
+    def to_vtk(self) -> Tuple[npt.NDArray[np.signedinteger], npt.NDArray[np.signedinteger], npt.NDArray[np.uint8]]:
+        """
+        Get the (offsets, connectivity, cell types) arrays of a VTK unstructured grid.
+
+        vtkCellArray.SetData needs offsets and connectivity of the same signed type. Below 2^31 points and
+        indices they are int32 with the connectivity a signed view of the uint32 indices, uint64 indices are
+        viewed as int64 the same way. Wider uint32 connectivities are cast to int64, which copies them.
+        """
+        offsets = self.vtk_offsets
+        itemsize = self.connectivity.dtype.itemsize
+        if itemsize == 4 and len(self.vertices) <= 2**31 and len(self.connectivity) < 2**31:
+            return offsets.astype(np.int32), self.connectivity.view(np.int32), self.vtk_cell_types
+        if itemsize == 8:
+            return offsets, self.connectivity.view(np.int64), self.vtk_cell_types
+        return offsets, self.connectivity.astype(np.int64), self.vtk_cell_types
+
+    def to_meshio_cells(self) -> List[Tuple[str, npt.NDArray[np.integer]]]:
+        """Get the cells as meshio (cell type, data) blocks sharing memory with the connectivity."""
+        return [(SU2_TO_MESHIO_MAPPING[block_type], block) for block_type, block in self.blocks.items()]
+
+    def to_mesh(self) -> Mesh:
+        """Convert back to a meshly.Mesh with cells in their original order and marker elements grouped by type."""
+        max_index = np.iinfo(np.uint32).max
+        for indices in [self.connectivity, *(block for blocks in self.markers.values() for block in blocks.values())]:
+            if indices.dtype.itemsize > 4 and indices.size > 0 and indices.max() > max_index:
+                # meshly stores indices as uint32
+                raise ValueError(f"Meshes with {len(self.vertices)} points exceed uint32 indices, they can only be kept as CellBlocks")
+        offsets = self.vtk_offsets
+        if self.cell_ids is None:
+            sizes = np.diff(offsets)
+            indices = self.connectivity
+            cell_types = self.vtk_cell_types
+        else:
+            cell_order = np.argsort(self.cell_ids)
+            sizes = np.diff(offsets)[cell_order]
+            original_offsets = np.cumsum(sizes) - sizes
+            indices = self.connectivity[np.arange(int(sizes.sum()), dtype=np.int64) + np.repeat(offsets[:-1][cell_order] - original_offsets, sizes)]
+            cell_types = self.vtk_cell_types[cell_order]
+
+        markers = {}
+        marker_sizes = {}
+        marker_cell_types = {}
+        for marker_tag, marker_blocks in self.markers.items():
+            markers[marker_tag] = np.concatenate([block.ravel() for block in marker_blocks.values()]).astype(np.uint32)
+            marker_sizes[marker_tag] = np.repeat(
+                [block.shape[1] for block in marker_blocks.values()],
+                [len(block) for block in marker_blocks.values()],
+            ).astype(np.uint32)
+            marker_cell_types[marker_tag] = np.repeat(
+                [SU2_TO_VTK_MAPPING[block_type.value] for block_type in marker_blocks],
+                [len(block) for block in marker_blocks.values()],
+            ).astype(np.uint32)
+
+        return Mesh(
+            vertices=self.vertices,
+            indices=indices.astype(np.uint32),
+            index_sizes=sizes.astype(np.uint32),
+            cell_types=cell_types.astype(np.uint32),
+            markers=markers,
+            marker_sizes=marker_sizes,
+            marker_cell_types=marker_cell_types,
+            dim=self.dim,
+        )
+
+    @staticmethod
+    def from_mesh(mesh: Mesh) -> "CellBlocks":
+        """Group the cells of a meshly.Mesh by element type."""
+        def group_mesh_cells(indices, sizes, vtk_types):
+            sizes = np.asarray(sizes, dtype=np.int64)
+            su2_types = np.array([VTK_TO_SU2_MAPPING.get(int(vtk_type), int(vtk_type)) for vtk_type in np.unique(vtk_types)])
+            types = su2_types[np.searchsorted(np.unique(vtk_types), vtk_types)]
+            return group_cells(types, np.cumsum(sizes) - sizes, np.asarray(indices))
+
+        if mesh.indices is not None and mesh.index_sizes is not None and len(mesh.index_sizes) > 0:
+            connectivity, blocks, cell_ids = group_mesh_cells(mesh.indices, mesh.index_sizes, mesh.cell_types)
+        else:
+            connectivity, blocks, cell_ids = np.array([], dtype=np.uint32), {}, None
+
+        return CellBlocks(
+            vertices=np.asarray(mesh.vertices),
+            connectivity=connectivity,
+            blocks=blocks,
+            cell_ids=cell_ids,
+            dim=mesh.dim if mesh.dim is not None else 3,
+            markers={
+                marker_tag: group_mesh_cells(marker_indices, mesh.marker_sizes[marker_tag], mesh.marker_cell_types[marker_tag])[1]
+                for marker_tag, marker_indices in mesh.markers.items()
+            },
+        )
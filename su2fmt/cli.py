@@ -0,0 +1,257 @@
+"""
+Command line tool for inspecting, converting and benchmarking SU2 meshes.
+
+    su2fmt info mesh.su2
+    su2fmt convert --to su2.gz meshes/*.su2 -j 8
+    su2fmt extract-marker --marker wall mesh.su2
+    su2fmt renumber --order morton mesh.su2
+    su2fmt bench meshes/*.su2
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+import numpy as np
+from meshly import Mesh
+from su2fmt.exporter import export_mesh
+from su2fmt.parser import parse_mesh
+from su2fmt.renumber import RENUMBER_ORDERS, renumber_vertices
+from su2fmt.types import SU2ElementType, VTK_TO_SU2_MAPPING
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Output formats and the file suffix they are written with
+FORMAT_SUFFIXES = {
+    "su2": ".su2",
+    "su2.gz": ".su2.gz",
+    "fixed": ".fixed.su2",
+    "zip": ".zip",
+}
+INPUT_SUFFIXES = (".fixed.su2", ".su2.gz", ".su2", ".zip", ".gz")
+
+
+@dataclass
+class FileReport:
+    """Outcome of a command on a single file."""
+    file_path: str
+    message: str
+    seconds: float
+    # peak resident memory of the process that ran only this command
+    peak_bytes: int
+    ok: bool = True
+
+    def format(self) -> str:
+        status = "ok" if self.ok else "FAILED"
+        return f"{self.file_path}: {status} in {self.seconds:.3f}s, peak RSS {self.peak_bytes / 2**20:.1f} MB\n{self.message}"
+
+
+def load_mesh(file_path: str) -> Union[Mesh, List[Mesh]]:
+    """Load a SU2 (optionally gzip compressed) or meshly zip file."""
+    if file_path.endswith(".zip"):
+        return Mesh.load_from_zip(file_path)
+    return parse_mesh(file_path)
+
+
+def _load_single_zone(file_path: str) -> Mesh:
+    mesh = load_mesh(file_path)
+    if isinstance(mesh, list):
+        raise ValueError(f"{file_path} has {len(mesh)} zones, only single zone meshes can be written")
+    return mesh
+
+
+def save_mesh(mesh: Mesh, file_path: str, format: str):
+    if format == "zip":
+        mesh.save_to_zip(file_path)
+    else:
+        export_mesh(mesh, file_path, fixed_width=format == "fixed")
+
+
+def get_output_path(file_path: str, format: str, output_dir: Optional[str] = None, tag: str = "") -> str:
+    """Get the output path of a file: its name without mesh suffixes, an optional tag and the format suffix."""
+    name = os.path.basename(file_path)
+    for suffix in INPUT_SUFFIXES:
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+            break
+    output_path = os.path.join(output_dir or os.path.dirname(file_path), name + tag + FORMAT_SUFFIXES[format])
+    if os.path.abspath(output_path) == os.path.abspath(file_path):
+        raise ValueError(f"Output {output_path} would overwrite the input")
+    return output_path
+
+
+def _describe_mesh(mesh: Mesh) -> List[str]:
+    cell_types, counts = np.unique(np.asarray(mesh.cell_types), return_counts=True) if mesh.cell_types is not None else ([], [])
+    elements = ", ".join(
+        f"{SU2ElementType(VTK_TO_SU2_MAPPING.get(int(cell_type), int(cell_type))).name}: {count}"
+        for cell_type, count in zip(cell_types, counts)
+    )
+    lines = [f"NDIME= {mesh.dim} NPOIN= {mesh.vertex_count} NELEM= {mesh.polygon_count} ({elements})"]
+    for marker_tag in mesh.markers:
+        lines.append(f"MARKER_TAG= {marker_tag} MARKER_ELEMS= {len(mesh.marker_sizes[marker_tag])}")
+    return lines
+
+
+def info(file_path: str, options: Dict) -> str:
+    mesh = load_mesh(file_path)
+    meshes = mesh if isinstance(mesh, list) else [mesh]
+    lines = [f"size {os.path.getsize(file_path) / 2**20:.1f} MB, {len(meshes)} zone(s)"]
+    for izone, zone_mesh in enumerate(meshes, start=1):
+        lines += [f"zone {izone}: {line}" if i == 0 else f"  {line}" for i, line in enumerate(_describe_mesh(zone_mesh))]
+    return "\n".join(lines)
+
+
+def convert(file_path: str, options: Dict) -> str:
+    output_path = get_output_path(file_path, options["to"], options["output_dir"])
+    save_mesh(_load_single_zone(file_path), output_path, options["to"])
+    return f"wrote {output_path}"
+
+
+def extract_marker(file_path: str, options: Dict) -> str:
+    mesh = _load_single_zone(file_path)
+    output_path = get_output_path(file_path, options["to"], options["output_dir"], f"_{options['marker']}")
+    save_mesh(mesh.extract_by_marker(options["marker"]), output_path, options["to"])
+    return f"wrote {output_path}"
+
+
+def renumber(file_path: str, options: Dict) -> str:
+    mesh = renumber_vertices(_load_single_zone(file_path), options["order"])
+    output_path = get_output_path(file_path, options["to"], options["output_dir"], "_renumbered")
+    save_mesh(mesh, output_path, options["to"])
+    return f"wrote {output_path}"
+
+
+def get_peak_rss() -> int:
+    """Get the peak resident memory of this process in bytes, 0 where it is unavailable."""
+    if resource is None:
+        return 0
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak_rss if sys.platform == "darwin" else peak_rss * 1024
+
+
+def _time(function: Callable, *args, repeat: int = 1) -> float:
+    """Get the fastest duration of repeated calls."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+def _trace_peak(function: Callable, *args) -> int:
+    """Get the peak memory allocated during a call, measured separately as tracing slows Python code down."""
+    tracemalloc.start()
+    try:
+        function(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench(file_path: str, options: Dict) -> str:
+    repeat = options["repeat"]
+    size = os.path.getsize(file_path)
+    parse_seconds = _time(load_mesh, file_path, repeat=repeat)
+    parse_peak = _trace_peak(load_mesh, file_path)
+    lines = [f"parse {parse_seconds:.3f}s ({size / 2**20 / parse_seconds:.1f} MB/s), peak allocated {parse_peak / 2**20:.1f} MB"]
+
+    mesh = _load_single_zone(file_path)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for format in FORMAT_SUFFIXES:
+            output_path = os.path.join(temp_dir, "bench" + FORMAT_SUFFIXES[format])
+            export_seconds = _time(save_mesh, mesh, output_path, format, repeat=repeat)
+            export_peak = _trace_peak(save_mesh, mesh, output_path, format)
+            reparse_seconds = _time(load_mesh, output_path, repeat=repeat)
+            lines.append(
+                f"{format}: export {export_seconds:.3f}s, peak allocated {export_peak / 2**20:.1f} MB, "
+                f"parse {reparse_seconds:.3f}s, size {os.path.getsize(output_path) / 2**20:.1f} MB"
+            )
+    return "\n".join(lines)
+
+
+COMMANDS: Dict[str, Callable[[str, Dict], str]] = {
+    "info": info,
+    "convert": convert,
+    "extract-marker": extract_marker,
+    "renumber": renumber,
+    "bench": bench,
+}
+
+
+def run_command(command: str, file_path: str, options: Dict) -> FileReport:
+    """
+    Run a command on a file, recording its duration and the peak memory of the calling process.
+
+    main runs every file of a multi-file invocation in a fresh worker process, so the peak covers only this command.
+    """
+    start = time.perf_counter()
+    try:
+        message = COMMANDS[command](file_path, options)
+        ok = True
+    except Exception as error:
+        message = f"{type(error).__name__}: {error}"
+        ok = False
+    return FileReport(file_path, message, time.perf_counter() - start, get_peak_rss(), ok)
+
+
+def _run_command_args(args: Tuple[str, str, Dict]) -> FileReport:
+    return run_command(*args)
+
+
+def get_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="su2fmt", description="Inspect, convert and benchmark SU2 meshes")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_command(name: str, help: str) -> argparse.ArgumentParser:
+        subparser = subparsers.add_parser(name, help=help)
+        subparser.add_argument("files", nargs="+", help="mesh files (.su2, .su2.gz or meshly .zip)")
+        subparser.add_argument("-j", "--workers", type=int, default=1, help="number of worker processes")
+        return subparser
+
+    def add_output_arguments(subparser: argparse.ArgumentParser, default_format: Optional[str]):
+        subparser.add_argument("--to", choices=list(FORMAT_SUFFIXES), default=default_format, required=default_format is None, help="output format")
+        subparser.add_argument("-o", "--output-dir", help="output directory, defaults to the directory of each input")
+
+    add_command("info", "print zones, element counts and markers")
+    add_output_arguments(add_command("convert", "convert between ASCII, compressed, fixed width and meshly zip files"), None)
+    extract_parser = add_command("extract-marker", "write the elements of a marker as a surface mesh")
+    extract_parser.add_argument("-m", "--marker", required=True, help="marker tag")
+    add_output_arguments(extract_parser, "su2")
+    renumber_parser = add_command("renumber", "renumber vertices for memory locality")
+    renumber_parser.add_argument("--order", choices=RENUMBER_ORDERS, default="first-touch")
+    add_output_arguments(renumber_parser, "su2")
+    bench_parser = add_command("bench", "time parsing and exporting in every format")
+    bench_parser.add_argument("--repeat", type=int, default=1, help="runs per measurement, the fastest is reported")
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = get_argument_parser().parse_args(argv)
+    options = {key: value for key, value in vars(args).items() if key not in ("command", "files", "workers")}
+    tasks = [(args.command, file_path, options) for file_path in args.files]
+
+    ok = True
+    if len(tasks) > 1:
+        # a fresh process per file, otherwise the peak memory of a large file shows up in the reports of later files
+        with multiprocessing.Pool(processes=max(args.workers, 1), maxtasksperchild=1) as pool:
+            for report in pool.imap(_run_command_args, tasks):
+                print(report.format(), flush=True)
+                ok &= report.ok
+    else:
+        for report in map(_run_command_args, tasks):
+            print(report.format(), flush=True)
+            ok &= report.ok
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
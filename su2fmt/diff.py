@@ -0,0 +1,92 @@
+"""Comparison of meshes that share most of their data, e.g. between shape optimization iterations."""
+import hashlib
+from dataclasses import dataclass, field
+from typing import List, Optional
+import numpy as np
+import numpy.typing as npt
+from meshly import Mesh
+
+
+def _arrays_equal(a, b) -> bool:
+    if a is None or b is None:
+        return a is None and b is None
+    return np.array_equal(np.asarray(a), np.asarray(b))
+
+
+def _update_hash(hasher, array) -> None:
+    if array is None:
+        hasher.update(b"None")
+        return
+    array = np.ascontiguousarray(array)
+    hasher.update(f"{array.dtype.str}{array.shape}".encode())
+    hasher.update(memoryview(array).cast("B"))
+
+
+def get_topology_hash(mesh: Mesh) -> str:
+    """Hash everything of a mesh except its vertex coordinates: vertex count, connectivity and markers."""
+    hasher = hashlib.sha1()
+    hasher.update(f"dim={mesh.dim};vertices={len(mesh.vertices)}".encode())
+    _update_hash(hasher, mesh.indices)
+    _update_hash(hasher, mesh.index_sizes)
+    _update_hash(hasher, mesh.cell_types)
+    for marker_tag, marker_indices in mesh.markers.items():
+        hasher.update(f"marker={marker_tag}".encode())
+        _update_hash(hasher, marker_indices)
+        _update_hash(hasher, mesh.marker_sizes.get(marker_tag))
+        _update_hash(hasher, mesh.marker_cell_types.get(marker_tag))
+    return hasher.hexdigest()
+
+
+@dataclass
+class MeshDiff:
+    """Differences between two meshes."""
+    dim_changed: bool = False
+    vertex_count_changed: bool = False
+    connectivity_changed: bool = False
+    markers_added: List[str] = field(default_factory=list)
+    markers_removed: List[str] = field(default_factory=list)
+    markers_changed: List[str] = field(default_factory=list)
+    # indices of vertices that moved more than the tolerance, None if the vertex counts differ
+    moved_vertices: Optional[npt.NDArray[np.int64]] = None
+    max_displacement: float = 0.0
+
+    @property
+    def topology_changed(self) -> bool:
+        """Whether anything besides the vertex coordinates changed."""
+        return (
+            self.dim_changed or self.vertex_count_changed or self.connectivity_changed
+            or bool(self.markers_added or self.markers_removed or self.markers_changed)
+        )
+
+    @property
+    def is_identical(self) -> bool:
+        return not self.topology_changed and self.moved_vertices is not None and len(self.moved_vertices) == 0
+
+
+def diff_meshes(old: Mesh, new: Mesh, atol: float = 0.0) -> MeshDiff:
+    """Report what changed from one mesh to another, vertices moving more than atol count as moved."""
+    diff = MeshDiff(
+        dim_changed=old.dim != new.dim,
+        vertex_count_changed=len(old.vertices) != len(new.vertices),
+        connectivity_changed=not (
+            _arrays_equal(old.indices, new.indices)
+            and _arrays_equal(old.index_sizes, new.index_sizes)
+            and _arrays_equal(old.cell_types, new.cell_types)
+        ),
+        markers_added=[marker_tag for marker_tag in new.markers if marker_tag not in old.markers],
+        markers_removed=[marker_tag for marker_tag in old.markers if marker_tag not in new.markers],
+        markers_changed=[
+            marker_tag for marker_tag in old.markers
+            if marker_tag in new.markers and not (
+                _arrays_equal(old.markers[marker_tag], new.markers[marker_tag])
+                and _arrays_equal(old.marker_sizes.get(marker_tag), new.marker_sizes.get(marker_tag))
+                and _arrays_equal(old.marker_cell_types.get(marker_tag), new.marker_cell_types.get(marker_tag))
+            )
+        ],
+    )
+
+    if not diff.vertex_count_changed:
+        displacement = np.linalg.norm(np.asarray(new.vertices, dtype=np.float64) - np.asarray(old.vertices, dtype=np.float64), axis=1)
+        diff.moved_vertices = np.flatnonzero(displacement > atol)
+        diff.max_displacement = float(displacement.max()) if len(displacement) else 0.0
+    return diff
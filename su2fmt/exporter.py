@@ -1,10 +1,19 @@
+import io
+import os
+import shutil
+import tempfile
 import numpy.typing as npt
-from typing import List
+from typing import Iterator, List, Optional, TextIO
 import numpy as np
 from meshly import Mesh
+from su2fmt.diff import get_topology_hash
+from su2fmt.files import is_compressed, open_mesh_file
+from su2fmt.fixed_width import FIXED_WIDTH_KEY, FORMAT_CHUNK_SIZE, encode_int_records, iter_point_records
 from su2fmt.types import SU2ElementType, VTK_TO_SU2_MAPPING
 
 ELEMENT_INDENT = " " * 2
+POINT_SPACES = " " * 8
+TOPOLOGY_HASH_KEY = "% TOPOLOGY_HASH="
 
 def get_element_vertex_count(element_type: int) -> int:
     """Get the number of vertices for a given element type."""
@@ -27,17 +36,167 @@ def get_element_vertex_count(element_type: int) -> int:
 
 def get_unused_point_indexes(points: npt.NDArray[np.float64], indices: npt.NDArray[np.int64]):
     """Find unused point indexes in the mesh."""
-    used_point_indexes = set()
-    point_indexes = set(range(len(points)))
-    for point_index in indices:
-        used_point_indexes.add(point_index)
-    return point_indexes.difference(used_point_indexes)
-
-def export_mesh(mesh: Mesh, file_path: str):
-    """Export a meshly.Mesh to SU2 format file."""
-    with open(file_path, 'w+') as file:
-        spaces = " " * 8
+    used = np.zeros(len(points), dtype=bool)
+    used[indices] = True
+    return set(np.flatnonzero(~used).tolist())
+
+def write_points_section(file: TextIO, mesh: Mesh, fixed_width: bool = False):
+    """Write the NPOIN section of a mesh line by line, skipping points no element uses."""
+    ndime = mesh.dim if hasattr(mesh, 'dim') else 3
+    spaces = POINT_SPACES
+    unused_point_indexes = get_unused_point_indexes(mesh.vertices, np.asarray(mesh.indices)) if mesh.indices is not None and len(mesh.indices) > 0 else set()
+    npoin = len(mesh.vertices)
+
+    file.write(f"NPOIN= {npoin - len(unused_point_indexes)}\n")
+    if fixed_width:
+        point_indexes = np.setdiff1d(np.arange(npoin), np.fromiter(unused_point_indexes, dtype=np.int64, count=len(unused_point_indexes)))
+        vertices = np.asarray(mesh.vertices)[point_indexes]
+        for records in iter_point_records(vertices[:, :2] if ndime == 2 else vertices, point_indexes):
+            file.write(records)
+        return
+
+    for index, point in enumerate(mesh.vertices):
+        if index in unused_point_indexes:
+            continue
+        point_row = [*(point[:-1] if ndime == 2 else point), index]
+        file.write(f"{spaces}{spaces.join(map(str, point_row))}\n")
+
+def format_points_section(mesh: Mesh, fixed_width: bool = False) -> str:
+    """Format the NPOIN section of a mesh in memory, to splice it into an existing file."""
+    section = io.StringIO()
+    write_points_section(section, mesh, fixed_width)
+    return section.getvalue()
+
+def iter_fixed_width_elements(indices: npt.NDArray, sizes: npt.NDArray, vtk_types: npt.NDArray, with_index: bool) -> Iterator[str]:
+    """Format elements as fixed width records of SU2 type, vertices and optionally the element index, FORMAT_CHUNK_SIZE records at a time."""
+    sizes = np.asarray(sizes, dtype=np.int64)
+    vtk_types = np.asarray(vtk_types, dtype=np.int64)
+    num_elements = len(sizes)
+    if num_elements == 0:
+        return
+    extra_fields = 2 if with_index else 1
+    num_fields = int(sizes.max()) + extra_fields
+
+    su2_types = np.arange(max(int(vtk_types.max()), *VTK_TO_SU2_MAPPING) + 1)
+    su2_types[list(VTK_TO_SU2_MAPPING)] = list(VTK_TO_SU2_MAPPING.values())
+    element_types = su2_types[vtk_types]
+    # all chunks share the field width of the largest value in the section
+    largest = max(int(np.max(indices)) if len(indices) > 0 else 0, int(element_types.max()), num_elements - 1 if with_index else 0)
+    width = len(str(largest))
+
+    offsets = np.cumsum(sizes) - sizes
+    columns = np.arange(num_fields)
+    for chunk_start in range(0, num_elements, FORMAT_CHUNK_SIZE):
+        chunk_sizes = sizes[chunk_start:chunk_start + FORMAT_CHUNK_SIZE]
+        chunk_offset = int(offsets[chunk_start])
+        values = np.zeros((len(chunk_sizes), num_fields), dtype=np.int64)
+        values[:, 0] = element_types[chunk_start:chunk_start + FORMAT_CHUNK_SIZE]
+        values[(columns >= 1) & (columns <= chunk_sizes[:, None])] = indices[chunk_offset:chunk_offset + int(chunk_sizes.sum())]
+        if with_index:
+            values[np.arange(len(chunk_sizes)), chunk_sizes + 1] = np.arange(chunk_start, chunk_start + len(chunk_sizes))
+        yield encode_int_records(values, chunk_sizes + extra_fields, width).decode()
+
+def read_header_comments(file_path: str) -> List[str]:
+    """Read the comment lines an export wrote at the start of a file."""
+    if not os.path.exists(file_path):
+        return []
+    comments = []
+    with open_mesh_file(file_path, 'r') as file:
+        for line in file:
+            if not line.startswith("%"):
+                break
+            comments.append(line.strip())
+    return comments
+
+def read_topology_hash(file_path: str) -> Optional[str]:
+    """Read the topology hash an incremental export recorded at the start of a file."""
+    for line in read_header_comments(file_path):
+        if line.startswith(TOPOLOGY_HASH_KEY):
+            return line[len(TOPOLOGY_HASH_KEY):].strip()
+    return None
+
+def replace_points_section(file_path: str, points_section: str):
+    """
+    Replace the NPOIN section of a single zone file, in place if its size is unchanged.
+
+    Otherwise the file is rewritten to a temporary file next to it, which replaces it once complete. That
+    is the usual case for variable width files since the formatted length of the coordinates changes with
+    their values. The rest of the file is copied in blocks, so memory stays bounded either way.
+    """
+    section = points_section.encode()
+    with open(file_path, 'r+b') as file:
+        start: Optional[int] = None
+        offset = 0
+        for line in file:
+            if line.strip().startswith(b'NPOIN='):
+                start = offset
+                offset += len(line)
+                npoin = int(line.split(b'=', 1)[1].split()[0])
+                for _ in range(npoin):
+                    offset += len(file.readline())
+                break
+            offset += len(line)
+        if start is None:
+            raise ValueError(f"No NPOIN section found in {file_path}")
+
+        if offset - start == len(section):
+            file.seek(start)
+            file.write(section)
+            return
+
+    temp_file = tempfile.NamedTemporaryFile(dir=os.path.dirname(os.path.abspath(file_path)), suffix=".tmp", delete=False)
+    try:
+        with temp_file, open(file_path, 'rb') as file:
+            _copy_bytes(file, temp_file, start)
+            temp_file.write(section)
+            file.seek(offset)
+            shutil.copyfileobj(file, temp_file)
+        shutil.copymode(file_path, temp_file.name)
+        os.replace(temp_file.name, file_path)
+    except BaseException:
+        os.unlink(temp_file.name)
+        raise
+
+def _copy_bytes(source, target, num_bytes: int, block_size: int = 1 << 20):
+    while num_bytes > 0:
+        block = source.read(min(block_size, num_bytes))
+        if not block:
+            break
+        target.write(block)
+        num_bytes -= len(block)
+
+def export_mesh(mesh: Mesh, file_path: str, incremental: bool = False, fixed_width: bool = False):
+    """
+    Export a meshly.Mesh to SU2 format file, gzip compressed if the path ends in .gz.
+
+    With incremental=True the file records a hash of the mesh topology (everything but the vertex coordinates).
+    Later incremental exports of a mesh with the same topology to that file only rewrite its NPOIN section.
+    Only fixed width files keep the size of that section, so only they save the rewrite of the sections
+    after it; variable width files are spliced, which still skips formatting the elements and markers.
+
+    With fixed_width=True every record of a section has the same byte length, see su2fmt.fixed_width.
+    Such files are parsed without tokenizing, support random access through read_points and read_elements,
+    and incremental exports overwrite their points in place.
+    """
+    topology_hash = get_topology_hash(mesh) if incremental else None
+    if (
+        topology_hash is not None
+        and not is_compressed(file_path)
+        and read_topology_hash(file_path) == topology_hash
+        # the elements and markers have to keep the layout the file declares
+        and (FIXED_WIDTH_KEY in read_header_comments(file_path)) == fixed_width
+    ):
+        replace_points_section(file_path, format_points_section(mesh, fixed_width))
+        return
+
+    with open_mesh_file(file_path, 'w+') as file:
+        spaces = POINT_SPACES
         
+        if topology_hash is not None:
+            file.write(f"{TOPOLOGY_HASH_KEY} {topology_hash}\n")
+        if fixed_width:
+            file.write(f"{FIXED_WIDTH_KEY}\n")
+
         # Get dimension from mesh
         ndime = mesh.dim if hasattr(mesh, 'dim') else 3
         
@@ -45,21 +204,17 @@ def export_mesh(mesh: Mesh, file_path: str):
         file.write(f"NDIME= {ndime}\n")
         
         # Write points
-        unused_point_indexes = get_unused_point_indexes(mesh.vertices, np.asarray(mesh.indices)) if mesh.indices is not None and len(mesh.indices) > 0 else set()
-        npoin = len(mesh.vertices)
-        file.write(f"NPOIN= {npoin - len(unused_point_indexes)}\n")
-        
-        for index, point in enumerate(mesh.vertices):
-            if index in unused_point_indexes:
-                continue
-            point_row = [*(point[:-1] if ndime == 2 else point), index]
-            file.write(f"{spaces}{spaces.join(map(str, point_row))}\n")
+        write_points_section(file, mesh, fixed_width)
 
         # Write elements
         nelem = mesh.polygon_count if mesh.indices is not None and len(mesh.indices) > 0 else 0
         file.write(f"NELEM= {nelem}\n")
         
-        if mesh.indices is not None and len(mesh.indices) > 0 and mesh.cell_types is not None:
+        if fixed_width and nelem > 0 and mesh.cell_types is not None:
+            index_sizes = mesh.index_sizes if mesh.index_sizes is not None else [get_element_vertex_count(int(vtk_type)) for vtk_type in mesh.cell_types]
+            for records in iter_fixed_width_elements(np.asarray(mesh.indices), index_sizes, mesh.cell_types, with_index=True):
+                file.write(records)
+        elif mesh.indices is not None and len(mesh.indices) > 0 and mesh.cell_types is not None:
             # Reconstruct elements from flattened indices using index_sizes
             idx = 0
             element_index = 0
@@ -97,6 +252,13 @@ def export_mesh(mesh: Mesh, file_path: str):
             # Get marker cell types if available
             marker_cell_types = mesh.marker_cell_types.get(marker_tag) if hasattr(mesh, 'marker_cell_types') else None
             
+            if fixed_width and marker_cell_types is not None and len(marker_cell_types) == num_marker_elems:
+                for records in iter_fixed_width_elements(
+                    np.asarray(mesh.markers[marker_tag]), mesh.marker_sizes[marker_tag], marker_cell_types, with_index=False
+                ):
+                    file.write(records)
+                continue
+
             # Write marker elements
             for i, element_vertices in enumerate(marker_elements):
                 if marker_cell_types is None or i >= len(marker_cell_types):
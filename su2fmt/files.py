@@ -0,0 +1,18 @@
+"""Opening of plain and gzip compressed mesh files."""
+import gzip
+from typing import IO
+
+COMPRESSED_SUFFIX = ".gz"
+# zlib's default level, the gzip module's level 9 is several times slower for little gain on mesh files
+COMPRESS_LEVEL = 6
+
+
+def is_compressed(file_path: str) -> bool:
+    return str(file_path).endswith(COMPRESSED_SUFFIX)
+
+
+def open_mesh_file(file_path: str, mode: str) -> IO:
+    """Open a mesh file, transparently (de)compressing files ending in .gz."""
+    if is_compressed(file_path):
+        return gzip.open(file_path, mode.replace('+', '') + ('' if 'b' in mode else 't'), compresslevel=COMPRESS_LEVEL)
+    return open(file_path, mode)
@@ -0,0 +1,148 @@
+"""
+Fixed width SU2 ASCII records.
+
+Every record of a section has the same byte length: fields are right aligned to a common
+width and separated by one space, shorter element records are padded with trailing spaces.
+The result is still plain whitespace separated SU2 ASCII, but record k of a section starts
+at a known offset and the records can be decoded without tokenizing. Files written this way
+start with a FIXED_WIDTH_KEY comment, readers only seek to records of files declaring it.
+"""
+from typing import Iterator, Optional, Tuple
+import numpy as np
+import numpy.typing as npt
+
+# rows decoded at once, bounds the temporary digit arrays
+DECODE_CHUNK_SIZE = 1 << 20
+# rows formatted at once, bounds the temporary Python objects and character arrays
+FORMAT_CHUNK_SIZE = 1 << 16
+
+# comment line declaring that every section of a file is fixed width
+FIXED_WIDTH_KEY = "% FIXED_WIDTH"
+
+_SPACE = ord(' ')
+_ZERO = ord('0')
+
+
+def get_float_format(dtype: npt.DTypeLike) -> str:
+    """Get a fixed width format with enough digits to round trip the given float dtype."""
+    precision = 8 if np.dtype(dtype).itemsize <= 4 else 16
+    # sign, leading digit, point, digits, e, exponent sign and up to 3 exponent digits
+    return f"%{precision + 8}.{precision}e"
+
+
+def iter_point_records(points: npt.NDArray[np.floating], point_indexes: npt.NDArray[np.integer]) -> Iterator[str]:
+    """Format points followed by their index as fixed width records, FORMAT_CHUNK_SIZE records at a time."""
+    if len(points) == 0:
+        return
+    float_format = get_float_format(points.dtype)
+    index_width = len(str(int(point_indexes.max())))
+    record_format = f"{float_format} " * points.shape[1] + f"%{index_width}d\n"
+    for chunk_start in range(0, len(points), FORMAT_CHUNK_SIZE):
+        # %d formats the float64 indexes exactly, one float list avoids boxing into an object array
+        rows = np.column_stack((points[chunk_start:chunk_start + FORMAT_CHUNK_SIZE], point_indexes[chunk_start:chunk_start + FORMAT_CHUNK_SIZE]))
+        yield (record_format * len(rows)) % tuple(rows.astype(np.float64).ravel().tolist())
+
+
+def format_point_records(points: npt.NDArray[np.floating], point_indexes: npt.NDArray[np.integer]) -> str:
+    """Format points followed by their index as fixed width records."""
+    return "".join(iter_point_records(points, point_indexes))
+
+
+def encode_int_records(values: npt.NDArray[np.int64], counts: npt.NDArray[np.int64], width: Optional[int] = None) -> bytes:
+    """
+    Encode rows of non negative integers as fixed width records.
+
+    Row i holds counts[i] values in values[i, :counts[i]], the remaining fields are left blank.
+    The field width defaults to the digits of the largest value, pass it to encode a section in chunks.
+    """
+    num_rows, num_fields = values.shape
+    if num_rows == 0:
+        return b""
+    if width is None:
+        width = max(len(str(int(values.max()))), 1)
+    present = np.arange(num_fields) < counts[:, None]
+
+    chars = np.full((num_rows, num_fields, width + 1), _SPACE, dtype=np.uint8)
+    remaining = np.where(present, values, 0)
+    for position in range(width - 1, -1, -1):
+        # leading zeros stay blank, the last digit is always written
+        digit_present = present & ((remaining > 0) | (position == width - 1))
+        chars[:, :, position] = np.where(digit_present, _ZERO + remaining % 10, _SPACE)
+        remaining //= 10
+
+    records = chars.reshape(num_rows, -1)
+    records[:, -1] = ord('\n')
+    return records.tobytes()
+
+
+def get_record_length(block: bytes, num_records: int) -> Optional[int]:
+    """Get the record length including the newline if every line of a block has the same length."""
+    if num_records == 0:
+        return None
+    record_length = block.find(b'\n') + 1
+    if record_length == 0 or record_length * num_records != len(block):
+        return None
+    newlines = np.frombuffer(block, dtype=np.uint8)[record_length - 1::record_length]
+    if not (newlines == ord('\n')).all():
+        return None
+    return record_length
+
+
+def _decode_int_chunk(fields: npt.NDArray[np.uint8]) -> Optional[Tuple[npt.NDArray[np.int64], npt.NDArray[np.bool_]]]:
+    is_space = fields == _SPACE
+    is_digit = (fields >= _ZERO) & (fields <= ord('9'))
+    if not (is_space | is_digit).all():
+        return None
+    # digits have to be right aligned within their field and fields filled from the left
+    if not (is_digit[:, :, :-1] <= is_digit[:, :, 1:]).all():
+        return None
+    present = is_digit[:, :, -1]
+    if not (present[:, :-1] >= present[:, 1:]).all():
+        return None
+
+    values = np.zeros(fields.shape[:2], dtype=np.int64)
+    for position in range(fields.shape[2]):
+        values *= 10
+        values += np.where(is_digit[:, :, position], fields[:, :, position] - _ZERO, 0)
+    return values, present
+
+
+def decode_int_records(block: bytes, num_records: int) -> Optional[Tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]]:
+    """
+    Decode a block of fixed width integer records.
+
+    Returns all values in file order and the number of values of each record, or None if the
+    block is not laid out as fixed width records.
+    """
+    record_length = get_record_length(block, num_records)
+    if record_length is None:
+        return None
+    records = np.frombuffer(block, dtype=np.uint8).reshape(num_records, record_length)
+
+    # the field width follows from the end of the first (right aligned) field
+    first_record = records[0, :-1]
+    non_space = np.flatnonzero(first_record != _SPACE)
+    if len(non_space) == 0:
+        return None
+    trailing_spaces = np.flatnonzero(first_record[non_space[0]:] == _SPACE)
+    width = int(non_space[0] + trailing_spaces[0]) if len(trailing_spaces) else record_length - 1
+    if record_length % (width + 1) != 0:
+        return None
+    num_fields = record_length // (width + 1)
+
+    # every field is followed by a separator, the last one by the newline
+    slots = records.reshape(num_records, num_fields, width + 1)
+    if not (slots[:, :-1, width] == _SPACE).all():
+        return None
+
+    values = []
+    counts = np.empty(num_records, dtype=np.int64)
+    for chunk_start in range(0, num_records, DECODE_CHUNK_SIZE):
+        chunk = slots[chunk_start:chunk_start + DECODE_CHUNK_SIZE, :, :width]
+        decoded = _decode_int_chunk(chunk)
+        if decoded is None:
+            return None
+        chunk_values, present = decoded
+        values.append(chunk_values[present])
+        counts[chunk_start:chunk_start + len(chunk)] = present.sum(axis=1)
+    return np.concatenate(values), counts
@@ -1,220 +1,668 @@
-from typing import Dict, List, Optional, Union
+import re
+import warnings
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 import numpy as np
 import numpy.typing as npt
 from meshly import Mesh
-from su2fmt.types import SU2ElementType, SU2_TO_VTK_MAPPING
+from su2fmt.cell_blocks import CellBlockDict, CellBlocks, get_block_views, get_type_order, group_cells
+from su2fmt.files import open_mesh_file
+from su2fmt.fixed_width import FIXED_WIDTH_KEY, decode_int_records, get_record_length
+from su2fmt.types import SU2_ELEMENT_VERTEX_COUNT, SU2_TO_VTK_MAPPING
 
-def parse_mesh(file_path: str) -> Union[Mesh, List[Mesh]]:
-    with open(file_path, 'r') as file:
-        meshes = []
-        nzone: int = 1
+# Lookup tables indexed by SU2 element type value
+_VERTEX_COUNT_LOOKUP = np.full(max(SU2_ELEMENT_VERTEX_COUNT) + 1, -1, dtype=np.int64)
+_VERTEX_COUNT_LOOKUP[list(SU2_ELEMENT_VERTEX_COUNT)] = list(SU2_ELEMENT_VERTEX_COUNT.values())
+_VTK_TYPE_LOOKUP = np.zeros(max(SU2_TO_VTK_MAPPING) + 1, dtype=np.uint8)
+_VTK_TYPE_LOOKUP[list(SU2_TO_VTK_MAPPING)] = list(SU2_TO_VTK_MAPPING.values())
+
+# Lines parsed at once, bounds the temporary arrays of large sections
+PARSE_CHUNK_SIZE = 1 << 16
+
+# Blank or whitespace only lines after the first line of a block, comments are found with a plain substring search
+_BLANK_LINE_PATTERN = re.compile(rb'\n[ \t\r\f\v]*\n')
+
+
+def get_index_dtype(num_points: Optional[int]) -> np.dtype:
+    """Get the smallest unsigned integer dtype that can index num_points points."""
+    if num_points is not None and num_points > np.iinfo(np.uint32).max + 1:
+        return np.dtype(np.uint64)
+    return np.dtype(np.uint32)
+
+
+@dataclass
+class ElementSection:
+    """Elements of a NELEM or MARKER_ELEMS section."""
+    # SU2 element type of each element
+    types: npt.NDArray[np.uint8]
+    # number of vertices of each element
+    sizes: npt.NDArray[np.uint8]
+    # vertex indices of all elements flattened in file order, or in cell_ids order when grouped by type, see get_index_dtype
+    indices: npt.NDArray[np.unsignedinteger]
+    # file order index of each element in indices when they are grouped by element type and were not sorted by type
+    cell_ids: Optional[npt.NDArray[np.signedinteger]] = None
+
+    def get_offsets(self) -> npt.NDArray[np.int64]:
+        """Get the position of the first vertex of each element in indices, in the order of indices."""
+        sizes = (self.sizes if self.cell_ids is None else self.sizes[self.cell_ids]).astype(np.int64)
+        return np.cumsum(sizes) - sizes
+
+    def get_indices(self) -> npt.NDArray[np.unsignedinteger]:
+        """Get the vertex indices of all elements flattened in file order."""
+        if self.cell_ids is None:
+            return self.indices
+        sizes = self.sizes.astype(np.int64)
+        offsets = self.get_offsets()[np.argsort(self.cell_ids)]
+        return self.indices[np.arange(int(sizes.sum()), dtype=np.int64) + np.repeat(offsets - (np.cumsum(sizes) - sizes), sizes)]
+
+    def get_vtk_types(self) -> npt.NDArray[np.uint8]:
+        """Get the VTK cell type of each element."""
+        return _VTK_TYPE_LOOKUP[self.types]
+
+
+@dataclass
+class ZoneData:
+    """Raw parsed sections of a single zone."""
+    ndime: int
+    points: Optional[npt.NDArray[np.floating]] = None
+    elements: Optional[ElementSection] = None
+    markers: Dict[str, ElementSection] = field(default_factory=dict)
+
+    @property
+    def npoin(self) -> Optional[int]:
+        return len(self.points) if self.points is not None else None
+
+
+@dataclass
+class _LineCursor:
+    """Number of the last line read from a mesh file, to report errors with exact line numbers."""
+    line: int = 0
+
+
+def _get_header_value(line: bytes) -> str:
+    # trailing comments are not part of the value, e.g. MARKER_TAG= wall % no slip
+    return line.split(b'=', 1)[1].split(b'%', 1)[0].strip().decode()
+
+
+def _get_header_count(line: bytes, line_number: int) -> int:
+    try:
+        return int(_get_header_value(line).split()[0])
+    except (ValueError, IndexError):
+        raise ValueError(f"Could not parse the count of {line.split(b'=', 1)[0].decode()}. Line {line_number}: {line.decode().strip()}") from None
+
+
+def _is_clean_block(block: bytes) -> bool:
+    """Check that a block has no comments or blank lines, so every line is a data line."""
+    first_line_end = block.find(b'\n')
+    return (
+        b'%' not in block
+        and _BLANK_LINE_PATTERN.search(block) is None
+        and not block[:first_line_end + 1 if first_line_end >= 0 else len(block)].isspace()
+    )
+
+
+def _read_tolerant_block(
+    file: BinaryIO, lines: List[bytes], num_lines: int, section: str, cursor: _LineCursor
+) -> Tuple[bytes, npt.NDArray[np.int64]]:
+    """
+    Collect num_lines data lines starting with the given file lines, dropping comments and blank lines.
+
+    Reads on from the file until enough data lines are found. Returns the data lines and their line numbers in the file.
+    """
+    data_lines: List[bytes] = []
+    line_numbers: List[int] = []
+    while True:
+        for line in lines:
+            cursor.line += 1
+            data = line.split(b'%', 1)[0].strip()
+            if data:
+                data_lines.append(data + b'\n')
+                line_numbers.append(cursor.line)
+        num_missing = num_lines - len(data_lines)
+        if num_missing == 0:
+            return b"".join(data_lines), np.array(line_numbers, dtype=np.int64)
+        lines = list(islice(file, num_missing))
+        if not lines:
+            raise ValueError(f"{section} expects {num_lines} lines, but the file ended after {len(data_lines)} at line {cursor.line}")
+
+
+def _read_section_chunks(
+    file: BinaryIO, num_lines: int, section: str, cursor: _LineCursor
+) -> Iterator[Tuple[bytes, int, Sequence[int]]]:
+    """
+    Read the data lines of a section as blocks of at most PARSE_CHUNK_SIZE lines with their count and line numbers.
+
+    Blocks are read in bulk and only blocks with comments or blank lines are filtered line by line.
+    """
+    num_read = 0
+    while num_read < num_lines:
+        chunk_lines = min(PARSE_CHUNK_SIZE, num_lines - num_read)
+        lines = list(islice(file, chunk_lines))
+        block = b"".join(lines)
+        if len(lines) == chunk_lines and _is_clean_block(block):
+            line_numbers: Sequence[int] = range(cursor.line + 1, cursor.line + 1 + chunk_lines)
+            cursor.line += chunk_lines
+        else:
+            block, line_numbers = _read_tolerant_block(file, lines, chunk_lines, section, cursor)
+        yield block, chunk_lines, line_numbers
+        num_read += chunk_lines
+
+
+def _record_line_numbers(
+    chunks: Iterable[Tuple[bytes, int, Sequence[int]]], line_numbers: List[Sequence[int]]
+) -> Iterator[Tuple[bytes, int, Sequence[int]]]:
+    """Pass the blocks of a section through, keeping the line numbers of each block to report errors found later."""
+    for block, num_lines, block_line_numbers in chunks:
+        line_numbers.append(block_line_numbers)
+        yield block, num_lines, block_line_numbers
+
+
+def _get_file_line(file: BinaryIO, line_numbers: List[Sequence[int]], line_index: int) -> str:
+    """Read the line_index-th data line of a section again from the file, given the line numbers of its blocks."""
+    for block_line_numbers in line_numbers:
+        if line_index < len(block_line_numbers):
+            line_number = int(block_line_numbers[line_index])
+            file.seek(0)
+            line = next(islice(file, line_number - 1, None), b'')
+            return f"Line {line_number}: {line.decode().strip()}"
+        line_index -= len(block_line_numbers)
+    raise IndexError(f"No line {line_index} in the section")
+
+
+def _get_line_token_counts(block: bytes, num_lines: int) -> npt.NDArray[np.int64]:
+    """Count the whitespace separated tokens of each line of a block without splitting it in Python."""
+    if num_lines == 0:
+        return np.array([], dtype=np.int64)
+    buffer = np.frombuffer(block, dtype=np.uint8)
+    is_space = buffer <= ord(' ')
+    token_starts = np.flatnonzero(~is_space & np.concatenate(([True], is_space[:-1])))
+    line_ends = np.flatnonzero(buffer == ord('\n'))
+    if len(line_ends) < num_lines:
+        line_ends = np.append(line_ends, len(buffer))
+    return np.diff(np.searchsorted(token_starts, line_ends[:num_lines]), prepend=0)
+
+
+def _get_line(block: bytes, line_index: int, line_numbers: Sequence[int]) -> str:
+    line = block.split(b'\n')[line_index].decode().strip()
+    return f"Line {line_numbers[line_index]}: {line}"
+
+
+def _parse_values(block: bytes, dtype: npt.DTypeLike, section: str, line_numbers: Sequence[int]) -> npt.NDArray:
+    """Parse all whitespace separated numbers of a block."""
+    with warnings.catch_warnings():
+        # numpy signals unparsable text with a DeprecationWarning and returns the values read so far
+        warnings.simplefilter("error", DeprecationWarning)
+        try:
+            return np.fromstring(block, dtype=dtype, sep=" ")
+        except (ValueError, DeprecationWarning):
+            pass
+
+    # only on failure, find the offending line
+    parse_token = int if np.issubdtype(dtype, np.integer) else float
+    for line_index, line in enumerate(block.split(b'\n')[:len(line_numbers)]):
+        try:
+            for token in line.split():
+                parse_token(token)
+        except ValueError:
+            raise ValueError(f"Could not parse the values of {section}. {_get_line(block, line_index, line_numbers)}") from None
+    raise ValueError(f"Could not parse the values of {section}")
+
+
+def parse_points(
+    block: bytes,
+    num_points: int,
+    ndime: int,
+    out: Optional[npt.NDArray[np.floating]] = None,
+    line_numbers: Optional[Sequence[int]] = None,
+    is_fixed_width: bool = False,
+) -> npt.NDArray[np.floating]:
+    """
+    Parse the lines of a NPOIN section into (num_points, 3) coordinates, padding 2D points with z=0.
+
+    The coordinates are written into out when given, which has to be a (num_points, 3) array.
+    Errors report line_numbers, the file line of each line of the block, counting from 1 by default.
+    Blocks of files declaring FIXED_WIDTH_KEY with lines of equal length take the value count of every
+    line from the first one, other blocks count the values of each line.
+    """
+    if line_numbers is None:
+        line_numbers = range(1, num_points + 1)
+    values = _parse_values(block, np.float64, "NPOIN", line_numbers)
+    record_length = get_record_length(block, num_points) if is_fixed_width else None
+    counts = np.full(num_points, len(block[:record_length].split()), dtype=np.int64) if record_length is not None else None
+    if counts is None or counts.sum() != len(values):
+        counts = _get_line_token_counts(block, num_points)
+    if out is None:
+        points = np.zeros((num_points, 3), dtype=np.float64)
+    else:
+        points = out
+        points[:, ndime:] = 0
+    if num_points == 0:
+        return points
+    if len(points) != num_points:
+        raise ValueError(f"Points can not be written into an array of {len(points)} points, expected {num_points}")
+    if (counts < ndime).any():
+        line_index = int(np.argmax(counts < ndime))
+        raise ValueError(f"Point expects {ndime} coordinates, but found {counts[line_index]} values. {_get_line(block, line_index, line_numbers)}")
+
+    if (counts == counts[0]).all():
+        points[:, :ndime] = values.reshape(num_points, counts[0])[:, :ndime]
+    else:
+        line_starts = np.cumsum(counts) - counts
+        points[:, :ndime] = values[line_starts[:, None] + np.arange(ndime)]
+    return points
+
+
+def parse_point_chunks(
+    chunks: Iterable[Tuple[bytes, int, Sequence[int]]],
+    num_points: int,
+    ndime: int,
+    out: Optional[npt.NDArray[np.floating]] = None,
+    is_fixed_width: bool = False,
+) -> npt.NDArray[np.floating]:
+    """Parse the blocks of a NPOIN section chunk by chunk into (num_points, 3) coordinates, see parse_points."""
+    points = np.zeros((num_points, 3), dtype=np.float64) if out is None else out
+    if len(points) != num_points:
+        raise ValueError(f"Points can not be written into an array of {len(points)} points, expected {num_points}")
+    chunk_start = 0
+    for block, chunk_points, line_numbers in chunks:
+        parse_points(
+            block, chunk_points, ndime, out=points[chunk_start:chunk_start + chunk_points],
+            line_numbers=line_numbers, is_fixed_width=is_fixed_width,
+        )
+        chunk_start += chunk_points
+    return points
+
+
+def _get_element_vertices(
+    values: npt.NDArray[np.int64], starts: npt.NDArray[np.int64], sizes: npt.NDArray[np.integer]
+) -> npt.NDArray[np.int64]:
+    """Get the vertex indices of elements in file order from their parsed values."""
+    sizes = sizes.astype(np.int64)
+    offsets = np.cumsum(sizes) - sizes
+    return values[np.arange(int(sizes.sum()), dtype=np.int64) + np.repeat(starts - offsets, sizes)]
+
+
+def _get_element_of_vertex(sizes: npt.NDArray[np.integer], position: int) -> int:
+    """Get the element of the vertex at a position of the file order vertex indices."""
+    return int(np.searchsorted(np.cumsum(sizes, dtype=np.int64), position, side="right"))
+
+
+def _parse_element_values(
+    block: bytes, num_elements: int, section: str, line_numbers: Sequence[int]
+) -> Tuple[npt.NDArray[np.int64], npt.NDArray[np.int64], npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+    """Parse the values of element lines, returning them with the first vertex position, type and size of each element."""
+    fixed_width_records = decode_int_records(block, num_elements)
+    if fixed_width_records is not None:
+        values, counts = fixed_width_records
+    else:
+        counts = _get_line_token_counts(block, num_elements)
+        values = _parse_values(block, np.int64, section, line_numbers)
+    line_starts = np.cumsum(counts) - counts
+    types = values[line_starts]
+
+    unknown = (types < 0) | (types >= len(_VERTEX_COUNT_LOOKUP))
+    unknown[~unknown] = _VERTEX_COUNT_LOOKUP[types[~unknown]] < 0
+    if unknown.any():
+        line_index = int(np.argmax(unknown))
+        raise ValueError(f"Unknown element type: {types[line_index]}. {_get_line(block, line_index, line_numbers)}")
+
+    # the last value is an element index if there is one more value than the element type has vertices
+    sizes = _VERTEX_COUNT_LOOKUP[types]
+    num_values = counts - 1
+    invalid = (num_values != sizes) & (num_values != sizes + 1)
+    if invalid.any():
+        line_index = int(np.argmax(invalid))
+        raise ValueError(
+            f"Element type {types[line_index]} expects {sizes[line_index]} vertices, "
+            f"but found {num_values[line_index]} values (with or without element index). "
+            f"{_get_line(block, line_index, line_numbers)}"
+        )
+    return values, line_starts + 1, types, sizes
 
-        izone_len = 0
-        izone: int = 0
-        ndime: Optional[int] = None
-        nelem: Optional[int] = None
-        npoin: Optional[int] = None
-        nmark: int = 0
-        points: List[npt.NDArray[np.float32]] = []
-        elements: List[npt.NDArray[np.int64]] = []
-        element_types: List[SU2ElementType] = []
-        markers: Dict[str, List[npt.NDArray[np.int64]]] = {}
-        marker_types: Dict[str, List[SU2ElementType]] = {}
-
-        element_index: Optional[int] = None
-        point_index: Optional[int] = None
-        
+
+def parse_element_chunks(
+    chunks: Iterable[Tuple[bytes, int, Sequence[int]]],
+    num_elements: int,
+    section: str = "NELEM",
+    num_points: Optional[int] = None,
+    group_types: bool = False,
+) -> ElementSection:
+    """
+    Parse the blocks of a NELEM or MARKER_ELEMS section chunk by chunk.
+
+    The vertex indices are written straight into an array of the smallest index dtype for num_points,
+    which is grown in place as chunks come in. Without num_points (e.g. NELEM before NPOIN) the dtype
+    starts at uint32 and is widened once if an index does not fit.
+
+    With group_types the indices of each element type go into their own array, and the arrays are
+    joined in ascending type order by growing the first one in place, see ElementSection.cell_ids.
+    """
+    types = np.empty(num_elements, dtype=np.uint8)
+    sizes = np.empty(num_elements, dtype=np.uint8)
+    index_dtype = get_index_dtype(num_points)
+    # index arrays with the number of indices written to them, one per element type when grouping
+    buffers: Dict[int, npt.NDArray[np.unsignedinteger]] = {}
+    lengths: Dict[int, int] = {}
+    chunk_start = 0
+
+    for block, chunk_elements, line_numbers in chunks:
+        values, starts, chunk_types, chunk_sizes = _parse_element_values(block, chunk_elements, section, line_numbers)
+        chunk_end = chunk_start + chunk_elements
+        types[chunk_start:chunk_end] = chunk_types
+        sizes[chunk_start:chunk_end] = chunk_sizes
+
+        if group_types:
+            chunk_groups = [
+                (int(element_type), values[starts[chunk_types == element_type][:, None] + np.arange(_VERTEX_COUNT_LOOKUP[element_type])].ravel())
+                for element_type in np.unique(chunk_types)
+            ]
+        else:
+            chunk_groups = [(0, _get_element_vertices(values, starts, chunk_sizes))]
+
+        for key, chunk_indices in chunk_groups:
+            if len(chunk_indices) > 0:
+                if chunk_indices.min() < 0:
+                    vertices = _get_element_vertices(values, starts, chunk_sizes)
+                    position = int(np.argmax(vertices < 0))
+                    line_index = _get_element_of_vertex(chunk_sizes, position)
+                    raise ValueError(f"{section} has negative vertex index {vertices[position]}. {_get_line(block, line_index, line_numbers)}")
+                if chunk_indices.max() > np.iinfo(index_dtype).max:
+                    index_dtype = np.dtype(np.uint64)
+                    buffers = {buffer_key: buffer.astype(np.uint64) for buffer_key, buffer in buffers.items()}
+
+            indices = buffers.setdefault(key, np.empty(0, dtype=index_dtype))
+            num_indices = lengths.get(key, 0)
+            required = num_indices + len(chunk_indices)
+            if required > len(indices):
+                # reserve for the remaining elements at the average size so far, resizing in place avoids copies
+                capacity = max(required, -(-required * num_elements // chunk_end))
+                indices.resize(capacity, refcheck=False)
+            indices[num_indices:required] = chunk_indices
+            lengths[key] = required
+        chunk_start = chunk_end
+
+    if chunk_start != num_elements:
+        raise ValueError(f"{section} expects {num_elements} lines, but only {chunk_start} were read")
+
+    keys = sorted(buffers)
+    if not keys:
+        return ElementSection(types=types, sizes=sizes, indices=np.empty(0, dtype=index_dtype))
+    indices = buffers.pop(keys[0])
+    num_indices = lengths[keys[0]]
+    indices.resize(sum(lengths.values()), refcheck=False)
+    for key in keys[1:]:
+        indices[num_indices:num_indices + lengths[key]] = buffers.pop(key)[:lengths[key]]
+        num_indices += lengths[key]
+    cell_ids = get_type_order(types) if group_types else None
+    return ElementSection(types=types, sizes=sizes, indices=indices, cell_ids=cell_ids)
+
+
+def parse_elements(block: bytes, num_elements: int, section: str = "NELEM", num_points: Optional[int] = None) -> ElementSection:
+    """Parse the lines of a NELEM or MARKER_ELEMS section, with or without trailing element indices."""
+    return parse_element_chunks([(block, num_elements, range(1, num_elements + 1))], num_elements, section, num_points)
+
+
+def parse_zones(file_path: str, group_types: bool = False, point_dtype: npt.DTypeLike = np.float64) -> Tuple[int, List[ZoneData]]:
+    """
+    Parse the raw sections of all zones of a mesh file, returning NZONE and the zones.
+
+    With group_types the element indices are grouped by element type while parsing, see parse_element_chunks.
+    The coordinates are parsed chunk by chunk straight into arrays of point_dtype.
+    """
+    with open_mesh_file(file_path, 'rb') as file:
+        zones: List[ZoneData] = []
+        nzone: int = 1
+        zone: Optional[ZoneData] = None
         marker_tag: Optional[str] = None
-        nmark_elems: Optional[int] = None
-        marker_index: Optional[int] = None
+        cursor = _LineCursor()
+        is_fixed_width = False
+        # line numbers of the element blocks of each zone and section, to report vertices beyond NPOIN
+        section_line_numbers: Dict[Tuple[int, str], List[Sequence[int]]] = {}
 
         for line in file:
+            cursor.line += 1
             line = line.strip()
 
-            if line.startswith('NZONE='):
-                nzone = int(line.split('=')[1].strip().split()[0])
-            elif line.startswith('NMARK='):
-                nmark = int(line.split('=')[1].strip().split()[0])
-            elif line.startswith('IZONE='):
-                izone_len += 1
-                izone = int(line.split('=')[1].strip().split()[0])
-            
-            elif line.startswith('NDIME='):
-                if izone_len > 1:
-                    assert ndime is not None, "NDIME must be defined for zone"
-                    assert nelem is not None, "NELEM must be defined for zone"
-                    assert npoin is not None, "NPOIN must be defined for zone"
-                    
-                    # Convert to meshly format
-                    indices = []
-                    index_sizes = []
-                    cell_types = []
-                    
-                    for elem, elem_type in zip(elements, element_types):
-                        indices.extend(elem)
-                        index_sizes.append(len(elem))
-                        cell_types.append(SU2_TO_VTK_MAPPING.get(elem_type.value, elem_type.value))
-                    
-                    # Convert markers to list-of-lists format for meshly
-                    mesh_markers = {}
-                    
-                    for marker_tag_key, marker_elements in markers.items():
-                        # Keep markers as list of lists (meshly format)
-                        mesh_markers[marker_tag_key] = [elem.tolist() for elem in marker_elements]
-                    
-                    mesh = Mesh(
-                        vertices=np.array(points),
-                        indices=np.array(indices, dtype=np.uint32) if indices else np.array([], dtype=np.uint32),
-                        index_sizes=np.array(index_sizes, dtype=np.uint32) if index_sizes else None,
-                        cell_types=np.array(cell_types, dtype=np.uint32) if cell_types else None,
-                        markers=mesh_markers if mesh_markers else {},
-                        dim=ndime
-                    )
-                    meshes.append(mesh)
-                    
-                ndime = int(line.split('=')[1].strip().split()[0])
-                nelem = None
-                npoin = None
-                elements = []
-                element_types = []
-                points = []
-                markers = {}
-                marker_types = {}
-                element_index = None
-                point_index = None
-                marker_tag = None
-                nmark_elems = None
-                marker_index = None
-
-            elif line.startswith('NELEM='):
-                nelem = int(line.split('=')[1].strip().split()[0])
-                element_index = 0
-
-            elif line.startswith('NPOIN='):
-                npoin = int(line.split('=')[1].strip().split()[0])
-                point_index = 0
-
-            elif line.startswith('MARKER_TAG='):
-                marker_tag = line.split('=')[1].strip()
-                
-            elif line.startswith('MARKER_ELEMS='):
-                nmark_elems = int(line.split('=')[1].strip().split()[0])
-                marker_index = 0
-
-            elif element_index is not None and nelem:
-                assert nelem is not None, "NELEM must be defined for zone before reading elements"
-                parts = line.split()
-                elem_type = SU2ElementType(int(parts[0]))
-                
-                # Determine expected number of vertices for this element type
-                type_vertex_counts = {
-                    SU2ElementType.LINE: 2,
-                    SU2ElementType.TRIANGLE: 3,
-                    SU2ElementType.QUADRILATERAL: 4,
-                    SU2ElementType.TETRAHEDRON: 4,
-                    SU2ElementType.PYRAMID: 5,
-                    SU2ElementType.PRISM: 6,
-                    SU2ElementType.HEXAHEDRON: 8,
-                }
-                expected_vertices = type_vertex_counts.get(elem_type)
-                
-                if expected_vertices is None:
-                    raise ValueError(f"Unknown element type: {elem_type} (value: {elem_type.value})")
-                
-                # Check if last element is an index or a vertex
-                # If we have exactly expected_vertices + 1 elements after type, last is index
-                # If we have exactly expected_vertices elements after type, no index
-                num_values = len(parts) - 1  # Excluding element type
-                
-                if num_values == expected_vertices + 1:
-                    # Has element index at end
-                    element = np.array(parts[1:-1], dtype=np.int64)
-                elif num_values == expected_vertices:
-                    # No element index
-                    element = np.array(parts[1:], dtype=np.int64)
-                else:
-                    raise ValueError(
-                        f"Element type {elem_type.name} expects {expected_vertices} vertices, "
-                        f"but found {num_values} values (with or without element index). "
-                        f"Line: {line}"
-                    )
-                
-                elements.append(element)
-                element_types.append(elem_type)
-                if element_index == nelem-1:
-                    element_index = None
-                else:
-                    element_index += 1
-
-            elif point_index is not None and npoin:
-                assert npoin is not None, "NPOIN must be defined for zone before reading points"
-                if ndime == 2:
-                    point = np.array(line.split()[:2]+[0], dtype=np.float32)
-                else:
-                    point = np.array(line.split()[:3], dtype=np.float32)
-                points.append(point)
-                if point_index == npoin-1:
-                    point_index = None
-                else:
-                    point_index += 1
-
-
-            elif marker_index is not None:
-                assert nmark_elems is not None, "MARKER_ELEMS must be defined for zone before reading markers"
-                
+            if line == FIXED_WIDTH_KEY.encode():
+                is_fixed_width = True
+
+            elif line.startswith(b'NZONE='):
+                nzone = _get_header_count(line, cursor.line)
+
+            elif line.startswith(b'NDIME='):
+                zone = ZoneData(ndime=_get_header_count(line, cursor.line))
+                zones.append(zone)
+
+            elif line.startswith(b'NPOIN='):
+                assert zone is not None, "NDIME must be defined for zone before reading points"
+                npoin = _get_header_count(line, cursor.line)
+                zone.points = parse_point_chunks(
+                    _read_section_chunks(file, npoin, "NPOIN", cursor), npoin, zone.ndime,
+                    out=np.zeros((npoin, 3), dtype=point_dtype), is_fixed_width=is_fixed_width,
+                )
+
+            elif line.startswith(b'NELEM='):
+                assert zone is not None, "NDIME must be defined for zone before reading elements"
+                nelem = _get_header_count(line, cursor.line)
+                chunks = _record_line_numbers(
+                    _read_section_chunks(file, nelem, "NELEM", cursor), section_line_numbers.setdefault((len(zones) - 1, "NELEM"), [])
+                )
+                zone.elements = parse_element_chunks(chunks, nelem, "NELEM", zone.npoin, group_types)
+
+            elif line.startswith(b'MARKER_TAG='):
+                marker_tag = _get_header_value(line)
+
+            elif line.startswith(b'MARKER_ELEMS='):
+                assert zone is not None, "NDIME must be defined for zone before reading markers"
                 assert marker_tag is not None, "MARKER_TAG must be defined for marker before reading marker elements"
-                if marker_tag not in markers:
-                    markers[marker_tag] = []
-                    marker_types[marker_tag] = []
-                marker_components = line.split()
-                markers[marker_tag].append(
-                    np.array(marker_components[1:], dtype=np.int64)
+                nmark_elems = _get_header_count(line, cursor.line)
+                section = f"MARKER_ELEMS of marker '{marker_tag}'"
+                chunks = _record_line_numbers(
+                    _read_section_chunks(file, nmark_elems, section, cursor), section_line_numbers.setdefault((len(zones) - 1, marker_tag), [])
                 )
-                marker_types[marker_tag].append(SU2ElementType(int(marker_components[0])))
-
-                if marker_index == nmark_elems - 1:
-                    marker_index = None
-                else:
-                    marker_index += 1
-
-        assert ndime is not None, "NDIME must be defined for zone"
-        assert nelem is not None, "NELEM must be defined for zone"
-        assert npoin is not None, "NPOIN must be defined for zone"
-        
-        # Convert final zone to meshly format
-        indices = []
-        index_sizes = []
-        cell_types = []
-        
-        for elem, elem_type in zip(elements, element_types):
-            indices.extend(elem)
-            index_sizes.append(len(elem))
-            cell_types.append(SU2_TO_VTK_MAPPING.get(elem_type.value, elem_type.value))
-        
-        # Convert markers to list-of-lists format for meshly
-        mesh_markers = {}
-        
-        for marker_tag_key, marker_elements in markers.items():
-            # Keep markers as list of lists (meshly format)
-            mesh_markers[marker_tag_key] = [elem.tolist() for elem in marker_elements]
-        
-        mesh = Mesh(
-            vertices=np.array(points),
-            indices=np.array(indices, dtype=np.uint32) if indices else np.array([], dtype=np.uint32),
-            index_sizes=np.array(index_sizes, dtype=np.uint32) if index_sizes else None,
-            cell_types=np.array(cell_types, dtype=np.uint32) if cell_types else None,
-            markers=mesh_markers if mesh_markers else {},
-            dim=ndime
+                marker_elements = parse_element_chunks(chunks, nmark_elems, section, zone.npoin, group_types)
+                if nmark_elems > 0:
+                    zone.markers[marker_tag] = marker_elements
+
+        assert zones, "NDIME must be defined for zone"
+        for izone, zone in enumerate(zones):
+            assert zone.elements is not None, "NELEM must be defined for zone"
+            assert zone.points is not None, "NPOIN must be defined for zone"
+            for section, elements in [("NELEM", zone.elements), *zone.markers.items()]:
+                if len(elements.indices) > 0 and elements.indices.max() >= len(zone.points):
+                    # only on failure, find the first element beyond NPOIN and read its line again
+                    indices = elements.get_indices()
+                    position = int(np.argmax(indices >= len(zone.points)))
+                    line = _get_file_line(file, section_line_numbers[(izone, section)], _get_element_of_vertex(elements.sizes, position))
+                    raise ValueError(f"{section} references vertex {indices[position]}, but NPOIN is {len(zone.points)}. {line}")
+            # indices parsed before NPOIN was known may be wider than needed
+            index_dtype = get_index_dtype(zone.npoin)
+            for elements in [zone.elements, *zone.markers.values()]:
+                if elements.indices.dtype != index_dtype:
+                    elements.indices = elements.indices.astype(index_dtype)
+        return nzone, zones
+
+
+def _get_fixed_record_length(file: BinaryIO, num_records: int) -> Optional[int]:
+    """
+    Get the record length of the section at the current position if it is fixed width, keeping the position.
+
+    Only checks the first record and the last record boundary, so it must only be used for files declaring FIXED_WIDTH_KEY.
+    """
+    start = file.tell()
+    record_length = len(file.readline())
+    # the last record has to span exactly one record length and be followed by a header or the end of the file
+    file.seek(start + (num_records - 1) * record_length - 1)
+    last_record_start = file.read(1) if num_records > 1 else b'\n'
+    file.seek(start + num_records * record_length - 1)
+    end = file.read(2)
+    file.seek(start)
+    if last_record_start != b'\n' or end[:1] != b'\n' or (len(end) == 2 and end[1:] in b'0123456789 \t+-.'):
+        return None
+    return record_length
+
+
+def _skip_section(file: BinaryIO, num_records: int, section: str, cursor: _LineCursor, is_fixed_width: bool):
+    if num_records == 0:
+        return
+    record_length = _get_fixed_record_length(file, num_records) if is_fixed_width else None
+    if record_length is not None:
+        file.seek(file.tell() + num_records * record_length)
+        cursor.line += num_records
+    else:
+        for _ in _read_section_chunks(file, num_records, section, cursor):
+            pass
+
+
+def _seek_section(
+    file: BinaryIO, keyword: bytes, start: int, stop: Optional[int], cursor: _LineCursor
+) -> Tuple[int, int, Optional[int], bool]:
+    """
+    Position a file at data line start of the first section with the given keyword.
+
+    Sections of files declaring FIXED_WIDTH_KEY are entered with a single seek, other sections are scanned line by line.
+    Returns the number of lines in [start, stop), NDIME of the zone, NPOIN if it precedes the section and whether
+    the file declares FIXED_WIDTH_KEY.
+    """
+    ndime = 3
+    npoin: Optional[int] = None
+    is_fixed_width = False
+    for line in iter(file.readline, b''):
+        cursor.line += 1
+        line = line.strip()
+        if line == FIXED_WIDTH_KEY.encode():
+            is_fixed_width = True
+        elif line.startswith(b'NDIME='):
+            ndime = _get_header_count(line, cursor.line)
+        elif line.startswith(keyword):
+            count = _get_header_count(line, cursor.line)
+            stop = count if stop is None else min(stop, count)
+            start = min(max(start, 0), stop)
+            record_length = _get_fixed_record_length(file, count) if is_fixed_width and count > 0 else None
+            if record_length is not None:
+                file.seek(file.tell() + start * record_length)
+                cursor.line += start
+            else:
+                _skip_section(file, start, line.split(b'=', 1)[0].decode(), cursor, is_fixed_width)
+            return stop - start, ndime, npoin, is_fixed_width
+        elif line.startswith((b'NPOIN=', b'NELEM=', b'MARKER_ELEMS=')):
+            count = _get_header_count(line, cursor.line)
+            if line.startswith(b'NPOIN='):
+                npoin = count
+            _skip_section(file, count, line.split(b'=', 1)[0].decode(), cursor, is_fixed_width)
+    raise ValueError(f"No {keyword.decode().rstrip('=')} section found")
+
+
+def read_points(file_path: str, start: int = 0, stop: Optional[int] = None) -> npt.NDArray[np.float64]:
+    """Read points [start, stop) of the first zone, seeking directly to them in fixed width files."""
+    with open_mesh_file(file_path, 'rb') as file:
+        cursor = _LineCursor()
+        num_points, ndime, _, is_fixed_width = _seek_section(file, b'NPOIN=', start, stop, cursor)
+        return parse_point_chunks(_read_section_chunks(file, num_points, "NPOIN", cursor), num_points, ndime, is_fixed_width=is_fixed_width)
+
+
+def read_elements(file_path: str, start: int = 0, stop: Optional[int] = None) -> ElementSection:
+    """Read elements [start, stop) of the first zone, seeking directly to them in fixed width files."""
+    with open_mesh_file(file_path, 'rb') as file:
+        cursor = _LineCursor()
+        num_elements, _, npoin, _ = _seek_section(file, b'NELEM=', start, stop, cursor)
+        return parse_element_chunks(_read_section_chunks(file, num_elements, "NELEM", cursor), num_elements, "NELEM", npoin)
+
+
+def load_coordinates(file_path: str, into: Union[Mesh, CellBlocks]) -> Union[Mesh, CellBlocks]:
+    """
+    Reload the point coordinates of the first zone into the vertices of an already parsed mesh in place.
+
+    Meant for mesh deformation loops, e.g. reading SU2's mesh_out.su2, where only the coordinates change:
+    the element and marker sections are skipped without parsing and only the point count is validated.
+    """
+    vertices = into.vertices
+    if not isinstance(vertices, np.ndarray) or vertices.ndim != 2 or vertices.shape[1] != 3:
+        raise ValueError("Coordinates can only be loaded into (num_points, 3) numpy vertices")
+
+    with open_mesh_file(file_path, 'rb') as file:
+        cursor = _LineCursor()
+        num_points, ndime, _, is_fixed_width = _seek_section(file, b'NPOIN=', 0, None, cursor)
+        if num_points != len(vertices):
+            raise ValueError(f"{file_path} has {num_points} points, but the mesh has {len(vertices)} vertices")
+        parse_point_chunks(
+            _read_section_chunks(file, num_points, "NPOIN", cursor), num_points, ndime, out=vertices, is_fixed_width=is_fixed_width
         )
-        meshes.append(mesh)
+    return into
+
+
+def _zone_to_mesh(zone: ZoneData) -> Mesh:
+    assert zone.points is not None and zone.elements is not None
+    elements = zone.elements
+    has_elements = len(elements.types) > 0
+    if elements.indices.dtype != np.uint32:
+        # meshly stores indices as uint32
+        raise ValueError(f"Meshes with {zone.npoin} points exceed uint32 indices, use parse_cell_blocks instead")
+
+    return Mesh(
+        vertices=zone.points,
+        indices=elements.get_indices() if has_elements else np.array([], dtype=np.uint32),
+        index_sizes=elements.sizes.astype(np.uint32) if has_elements else None,
+        cell_types=elements.get_vtk_types() if has_elements else None,
+        markers={marker_tag: marker.get_indices() for marker_tag, marker in zone.markers.items()},
+        marker_sizes={marker_tag: marker.sizes.astype(np.uint32) for marker_tag, marker in zone.markers.items()},
+        marker_cell_types={marker_tag: marker.get_vtk_types() for marker_tag, marker in zone.markers.items()},
+        dim=zone.ndime
+    )
+
+
+def _group_element_cells(
+    elements: ElementSection,
+) -> Tuple[npt.NDArray[np.unsignedinteger], CellBlockDict, Optional[npt.NDArray[np.signedinteger]]]:
+    if elements.cell_ids is None and not (elements.types[1:] >= elements.types[:-1]).all():
+        return group_cells(elements.types, elements.get_offsets(), elements.indices)
+    # indices grouped by type while parsing, or of elements sorted by type, already are the connectivity
+    block_types, block_counts = np.unique(elements.types, return_counts=True)
+    return elements.indices, get_block_views(elements.indices, block_types, block_counts), elements.cell_ids
+
+
+def _zone_to_cell_blocks(zone: ZoneData) -> CellBlocks:
+    assert zone.points is not None and zone.elements is not None
+    elements = zone.elements
+    connectivity, blocks, cell_ids = _group_element_cells(elements)
+    return CellBlocks(
+        vertices=zone.points,
+        connectivity=connectivity,
+        blocks=blocks,
+        cell_ids=cell_ids,
+        dim=zone.ndime,
+        markers={
+            marker_tag: _group_element_cells(marker)[1]
+            for marker_tag, marker in zone.markers.items()
+        },
+    )
+
+
+def parse_mesh(file_path: str) -> Union[Mesh, List[Mesh]]:
+    # meshly stores vertices as float32
+    nzone, zones = parse_zones(file_path, point_dtype=np.float32)
+    meshes = [_zone_to_mesh(zone) for zone in zones]
+
+    # Return single mesh if only one zone, otherwise return list
+    if len(meshes) == 1 and nzone == 1:
+        return meshes[0]
+    else:
+        return meshes
+
+
+def parse_cell_blocks(file_path: str) -> Union[CellBlocks, List[CellBlocks]]:
+    """Parse a mesh file straight into cells grouped by element type, see CellBlocks."""
+    nzone, zones = parse_zones(file_path, group_types=True)
+    cell_blocks = [_zone_to_cell_blocks(zone) for zone in zones]
+
+    if len(cell_blocks) == 1 and nzone == 1:
+        return cell_blocks[0]
+    else:
+        return cell_blocks
 
-        # Return single mesh if only one zone, otherwise return list
-        if len(meshes) == 1 and nzone == 1:
-            return meshes[0]
-        else:
-            return meshes
 
 def combine_meshes(meshes: List[Mesh]) -> List[Mesh]:
     """Combine meshes - for multi-zone support."""
     # Simply return the list as meshly.Mesh.combine() can be used if needed
-    return meshes
\ No newline at end of file
+    return meshes
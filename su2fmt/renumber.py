@@ -0,0 +1,72 @@
+"""Vertex renumbering for better memory locality of the connectivity."""
+from typing import Optional
+import numpy as np
+import numpy.typing as npt
+from meshly import Mesh
+
+RENUMBER_ORDERS = ("first-touch", "morton")
+
+
+def _spread_bits(values: npt.NDArray[np.uint64]) -> npt.NDArray[np.uint64]:
+    """Spread the lower 21 bits of each value so that two zero bits follow every bit."""
+    values = values & np.uint64(0x1FFFFF)
+    values = (values | (values << np.uint64(32))) & np.uint64(0x1F00000000FFFF)
+    values = (values | (values << np.uint64(16))) & np.uint64(0x1F0000FF0000FF)
+    values = (values | (values << np.uint64(8))) & np.uint64(0x100F00F00F00F00F)
+    values = (values | (values << np.uint64(4))) & np.uint64(0x10C30C30C30C30C3)
+    values = (values | (values << np.uint64(2))) & np.uint64(0x1249249249249249)
+    return values
+
+
+def get_morton_codes(
+    vertices: npt.NDArray[np.floating], low: Optional[npt.NDArray[np.floating]] = None, high: Optional[npt.NDArray[np.floating]] = None
+) -> npt.NDArray[np.uint64]:
+    """Get the 3D Morton (Z-order) code of each vertex within the box [low, high], the bounding box by default."""
+    vertices = np.asarray(vertices, dtype=np.float64)
+    low = vertices.min(axis=0) if low is None else low
+    high = vertices.max(axis=0) if high is None else high
+    extent = np.maximum(high - low, np.finfo(np.float64).tiny)
+    quantized = (np.clip((vertices - low) / extent, 0.0, 1.0) * 0x1FFFFF).astype(np.uint64)
+    return _spread_bits(quantized[:, 0]) | (_spread_bits(quantized[:, 1]) << np.uint64(1)) | (_spread_bits(quantized[:, 2]) << np.uint64(2))
+
+
+def get_morton_order(vertices: npt.NDArray[np.floating]) -> npt.NDArray[np.int64]:
+    """Get the vertex order along a 3D Morton (Z-order) curve of the bounding box."""
+    return np.argsort(get_morton_codes(vertices), kind="stable")
+
+
+def get_first_touch_order(num_vertices: int, indices: npt.NDArray[np.integer]) -> npt.NDArray[np.int64]:
+    """Get the vertex order of first use by the elements, unused vertices go last."""
+    first_use = np.full(num_vertices, len(indices), dtype=np.int64)
+    used, first_positions = np.unique(indices, return_index=True)
+    first_use[used] = first_positions
+    return np.argsort(first_use, kind="stable")
+
+
+def renumber_vertices(mesh: Mesh, order: str = "first-touch") -> Mesh:
+    """
+    Renumber the vertices of a mesh, updating its elements and markers.
+
+    "first-touch" numbers vertices in the order the elements first use them, "morton" numbers them
+    along a space filling curve. Both keep vertices of neighbouring elements close in memory.
+    """
+    if order not in RENUMBER_ORDERS:
+        raise ValueError(f"Unknown renumber order: {order}, expected one of {RENUMBER_ORDERS}")
+    indices = np.asarray(mesh.indices) if mesh.indices is not None else np.array([], dtype=np.uint32)
+    if order == "morton" and len(mesh.vertices) > 0:
+        new_to_old = get_morton_order(mesh.vertices)
+    else:
+        new_to_old = get_first_touch_order(len(mesh.vertices), indices)
+    old_to_new = np.empty_like(new_to_old)
+    old_to_new[new_to_old] = np.arange(len(new_to_old))
+
+    return Mesh(
+        vertices=np.asarray(mesh.vertices)[new_to_old],
+        indices=old_to_new[indices].astype(np.uint32),
+        index_sizes=mesh.index_sizes,
+        cell_types=mesh.cell_types,
+        markers={marker_tag: old_to_new[np.asarray(marker_indices)].astype(np.uint32) for marker_tag, marker_indices in mesh.markers.items()},
+        marker_sizes=dict(mesh.marker_sizes),
+        marker_cell_types=dict(mesh.marker_cell_types),
+        dim=mesh.dim,
+    )
@@ -0,0 +1,380 @@
+"""Bounding volume hierarchy over marker faces for nearest face and box queries, e.g. wall distances."""
+import hashlib
+import os
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+import numpy as np
+import numpy.typing as npt
+from meshly import Mesh
+from su2fmt.renumber import get_morton_codes
+
+# children per node of the hierarchy
+BRANCHING = 4
+# points or boxes queried at once, chunks with more (query, node) pairs than MAX_CANDIDATES are split
+QUERY_CHUNK_SIZE = 1 << 12
+MAX_CANDIDATES = 1 << 20
+# every SAMPLE_STRIDE-th point along the Morton curve is queried first, its nearest face bounds the following points
+SAMPLE_STRIDE = 8
+# triangles whose squared sine of the angle at the first corner is at most this are treated as their longest edge
+FLAT_TOLERANCE = 1e-12
+
+
+def _get_marker_primitives(mesh: Mesh, marker_tags: List[str]):
+    """Split marker faces into triangles and segments, quads become two triangles and vertex elements zero length segments."""
+    vertices = np.asarray(mesh.vertices, dtype=np.float64)
+    corners, is_segment, primitive_faces, face_markers, face_elements = [], [], [], [], []
+    num_faces = 0
+    for marker_id, marker_tag in enumerate(marker_tags):
+        marker_indices = np.asarray(mesh.markers[marker_tag], dtype=np.int64)
+        sizes = np.asarray(mesh.marker_sizes[marker_tag], dtype=np.int64)
+        offsets = np.cumsum(sizes) - sizes
+        face_markers.append(np.full(len(sizes), marker_id, dtype=np.int32))
+        face_elements.append(np.arange(len(sizes), dtype=np.int64))
+        for face_size in np.unique(sizes).tolist():
+            if face_size > 4:
+                raise ValueError(f"Marker {marker_tag} has elements with {face_size} vertices, expected lines, triangles or quads")
+            element_ids = np.flatnonzero(sizes == face_size)
+            faces = marker_indices[offsets[element_ids][:, None] + np.arange(face_size)]
+            # corners of each primitive, segments repeat their last vertex
+            local_corners = {1: [(0, 0, 0)], 2: [(0, 1, 1)], 3: [(0, 1, 2)], 4: [(0, 1, 2), (0, 2, 3)]}[face_size]
+            for local in local_corners:
+                corners.append(vertices[faces[:, local]])
+                is_segment.append(np.full(len(faces), face_size <= 2))
+                primitive_faces.append(num_faces + element_ids)
+        num_faces += len(sizes)
+    if not corners:
+        raise ValueError("No marker faces to index")
+    return (
+        np.concatenate(corners), np.concatenate(is_segment), np.concatenate(primitive_faces),
+        np.concatenate(face_markers), np.concatenate(face_elements),
+    )
+
+
+def _dot(a: npt.NDArray[np.float64], b: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    return np.einsum("ij,ij->i", a, b)
+
+
+def get_closest_points(
+    points: npt.NDArray[np.float64], corners: npt.NDArray[np.float64], is_segment: npt.NDArray[np.bool_]
+) -> npt.NDArray[np.float64]:
+    """Get the closest point of each triangle (or segment a, b, b) in corners (n, 3, 3) to the matching point."""
+    a, b, c = corners[:, 0], corners[:, 1], corners[:, 2]
+    ab, ac, ap = b - a, c - a, points - a
+    # closest points are a + v * ab + w * ac, v and w are picked by Voronoi region of the point,
+    # see Ericson, Real-Time Collision Detection 5.1.5
+    d1, d2 = _dot(ab, ap), _dot(ac, ap)
+    ab2, ab_ac, ac2 = _dot(ab, ab), _dot(ab, ac), _dot(ac, ac)
+    d3, d4 = d1 - ab2, d2 - ab_ac
+    d5, d6 = d1 - ab_ac, d2 - ac2
+    va, vb, vc = d3 * d6 - d5 * d4, d5 * d2 - d1 * d6, d1 * d4 - d3 * d2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        denom = va + vb + vc
+        v, w = vb / denom, vc / denom
+        # regions are assigned in reverse order of precedence, later ones win
+        in_bc = (va <= 0) & (d4 - d3 >= 0) & (d5 - d6 >= 0)
+        t = (d4 - d3) / ((d4 - d3) + (d5 - d6))
+        v, w = np.where(in_bc, 1 - t, v), np.where(in_bc, t, w)
+        in_ac = (vb <= 0) & (d2 >= 0) & (d6 <= 0)
+        v, w = np.where(in_ac, 0.0, v), np.where(in_ac, d2 / (d2 - d6), w)
+        in_c = (d6 >= 0) & (d5 <= d6)
+        v, w = np.where(in_c, 0.0, v), np.where(in_c, 1.0, w)
+        in_ab = (vc <= 0) & (d1 >= 0) & (d3 <= 0)
+        v, w = np.where(in_ab, d1 / (d1 - d3), v), np.where(in_ab, 0.0, w)
+        in_b = (d3 >= 0) & (d4 <= d3)
+        v, w = np.where(in_b, 1.0, v), np.where(in_b, 0.0, w)
+        in_a = (d1 <= 0) & (d2 <= 0)
+        v, w = np.where(in_a, 0.0, v), np.where(in_a, 0.0, w)
+
+    # segments and zero area triangles, e.g. of collapsed quads (a, a, c, d), project onto their longest edge
+    bc = c - b
+    bc2 = _dot(bc, bc)
+    is_flat = is_segment | (ab2 * ac2 - ab_ac * ab_ac <= FLAT_TOLERANCE * ab2 * ac2)
+    use_bc = bc2 > np.maximum(ab2, ac2)
+    use_ac = ~use_bc & (ac2 > ab2)
+    edge_starts = np.where(use_bc[:, None], b, a)
+    edges = np.where(use_bc[:, None], bc, np.where(use_ac[:, None], ac, ab))
+    edge2 = np.maximum(np.maximum(ab2, ac2), bc2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.clip(np.where(edge2 > 0, _dot(edges, points - edge_starts) / edge2, 0.0), 0.0, 1.0)
+    return np.where(is_flat[:, None], edge_starts + t[:, None] * edges, a + v[:, None] * ab + w[:, None] * ac)
+
+
+def _get_near_distance2(points: npt.NDArray[np.float64], lows: npt.NDArray[np.float64], highs: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    """Get the squared distance of each point to the nearest point of its box."""
+    return (np.maximum(np.maximum(lows - points, points - highs), 0.0) ** 2).sum(axis=1)
+
+
+def _get_children(pair_queries: npt.NDArray[np.int64], pair_nodes: npt.NDArray[np.int64], num_children: int):
+    """Replace every (query, node) pair by the pairs of the node's children."""
+    children = (pair_nodes[:, None] * BRANCHING + np.arange(BRANCHING)).ravel()
+    queries = np.repeat(pair_queries, BRANCHING)
+    valid = children < num_children
+    return queries[valid], children[valid]
+
+
+@dataclass
+class NearestFaces:
+    """Result of a nearest face query, face ids are -1 where no face is within the maximum distance."""
+    distances: npt.NDArray[np.float64]
+    face_ids: npt.NDArray[np.int64]
+    closest_points: npt.NDArray[np.float64]
+
+
+@dataclass
+class MarkerIndex:
+    """
+    Bounding volume hierarchy over the faces of mesh markers.
+
+    Faces are numbered marker by marker in the order of marker_tags, face_markers and face_elements
+    map them back to their marker and element index within that marker. Quads are stored as two
+    triangles and lines as segments, sorted along a Morton curve. Level 0 of the hierarchy holds the
+    bounding box of every primitive, each box of level l + 1 bounds BRANCHING boxes of level l.
+    """
+    marker_tags: List[str]
+    face_markers: npt.NDArray[np.int32]
+    face_elements: npt.NDArray[np.int64]
+    # primitive corners (n, 3, 3), segments repeat their second vertex
+    corners: npt.NDArray[np.float64]
+    is_segment: npt.NDArray[np.bool_]
+    # unit normal of each triangle, zero for segments and degenerate triangles
+    normals: npt.NDArray[np.float64]
+    primitive_faces: npt.NDArray[np.int64]
+    # Morton codes of the primitive centroids within [morton_low, morton_high]
+    morton_codes: npt.NDArray[np.uint64]
+    morton_low: npt.NDArray[np.float64]
+    morton_high: npt.NDArray[np.float64]
+    # boxes of level l are node_lows[level_starts[l]:level_starts[l + 1]], the last level is the root
+    node_lows: npt.NDArray[np.float64]
+    node_highs: npt.NDArray[np.float64]
+    level_starts: npt.NDArray[np.int64]
+    # hash of the indexed marker geometry, see get_marker_index
+    key: str = ""
+
+    @property
+    def face_count(self) -> int:
+        return len(self.face_markers)
+
+    @staticmethod
+    def from_mesh(mesh: Mesh, marker_tags: Optional[List[str]] = None) -> "MarkerIndex":
+        """Build the index over the given markers of a mesh, all markers by default."""
+        marker_tags = list(mesh.markers) if marker_tags is None else list(marker_tags)
+        primitives = _get_marker_primitives(mesh, marker_tags)
+        return MarkerIndex._build(marker_tags, *primitives, key=_get_marker_key(marker_tags, primitives[0]))
+
+    @staticmethod
+    def _build(marker_tags, corners, is_segment, primitive_faces, face_markers, face_elements, key) -> "MarkerIndex":
+        # neighbouring primitives along the curve end up in the same nodes
+        centroids = corners.mean(axis=1)
+        morton_low, morton_high = centroids.min(axis=0), centroids.max(axis=0)
+        morton_codes = get_morton_codes(centroids, morton_low, morton_high)
+        order = np.argsort(morton_codes, kind="stable")
+        corners, is_segment, primitive_faces, morton_codes = corners[order], is_segment[order], primitive_faces[order], morton_codes[order]
+
+        normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+        lengths = np.linalg.norm(normals, axis=1)
+        normals = np.divide(normals, lengths[:, None], out=np.zeros_like(normals), where=(lengths[:, None] > 0) & ~is_segment[:, None])
+
+        level_lows, level_highs = [corners.min(axis=1)], [corners.max(axis=1)]
+        while len(level_lows[-1]) > 1:
+            group_starts = np.arange(0, len(level_lows[-1]), BRANCHING)
+            level_lows.append(np.minimum.reduceat(level_lows[-1], group_starts, axis=0))
+            level_highs.append(np.maximum.reduceat(level_highs[-1], group_starts, axis=0))
+        level_starts = np.zeros(len(level_lows) + 1, dtype=np.int64)
+        np.cumsum([len(lows) for lows in level_lows], out=level_starts[1:])
+        return MarkerIndex(
+            marker_tags=marker_tags, face_markers=face_markers, face_elements=face_elements,
+            corners=corners, is_segment=is_segment, normals=normals, primitive_faces=primitive_faces,
+            morton_codes=morton_codes, morton_low=morton_low, morton_high=morton_high,
+            node_lows=np.concatenate(level_lows), node_highs=np.concatenate(level_highs), level_starts=level_starts, key=key,
+        )
+
+    def _get_level_size(self, level: int) -> int:
+        return int(self.level_starts[level + 1] - self.level_starts[level])
+
+    def query_nearest(self, points: npt.NDArray[np.floating], max_distance: float = np.inf) -> NearestFaces:
+        """Find the nearest marker face of each point (n, 3), or (n, 2) for planar meshes."""
+        points = np.asarray(points, dtype=np.float64)
+        if points.shape[1] == 2:
+            points = np.column_stack([points, np.zeros(len(points))])
+        result = NearestFaces(
+            distances=np.full(len(points), np.inf),
+            face_ids=np.full(len(points), -1, dtype=np.int64),
+            closest_points=np.full((len(points), 3), np.nan),
+        )
+        if len(points) == 0:
+            return result
+
+        # points close along the Morton curve mostly share their nearest face, so a sparse first pass
+        # gives the remaining points a tight bound from the start
+        order = np.argsort(get_morton_codes(points), kind="stable")
+        is_sample = np.arange(len(points)) % SAMPLE_STRIDE == 0
+        samples, others = order[is_sample], order[~is_sample]
+        sample_primitives = self._query_nearest_primitives(points, samples, max_distance, result)
+        hints = np.repeat(sample_primitives, SAMPLE_STRIDE)[:len(points)][~is_sample]
+        self._query_nearest_primitives(points, others, max_distance, result, hints)
+        return result
+
+    def _query_nearest_primitives(
+        self, points: npt.NDArray[np.float64], point_ids: npt.NDArray[np.int64], max_distance: float,
+        result: NearestFaces, hints: Optional[npt.NDArray[np.int64]] = None,
+    ) -> npt.NDArray[np.int64]:
+        """Query the given points chunk by chunk into result, returning the nearest primitive of each or -1."""
+        primitives = np.full(len(point_ids), -1, dtype=np.int64)
+        pending = [(start, min(start + QUERY_CHUNK_SIZE, len(point_ids))) for start in range(0, len(point_ids), QUERY_CHUNK_SIZE)]
+        while pending:
+            start, stop = pending.pop()
+            chunk_ids = point_ids[start:stop]
+            nearest = self._query_nearest_chunk(
+                points[chunk_ids], max_distance, stop - start > 1, hints[start:stop] if hints is not None else None
+            )
+            if nearest is None:
+                middle = (start + stop) // 2
+                pending += [(start, middle), (middle, stop)]
+                continue
+            primitives[start:stop], distance2, closest_points = nearest
+            found = primitives[start:stop] >= 0
+            result.distances[chunk_ids[found]] = np.sqrt(distance2[found])
+            result.face_ids[chunk_ids[found]] = self.primitive_faces[primitives[start:stop][found]]
+            result.closest_points[chunk_ids[found]] = closest_points[found]
+        return primitives
+
+    def _get_guess_distance2(self, points: npt.NDArray[np.float64], hints: Optional[npt.NDArray[np.int64]]) -> npt.NDArray[np.float64]:
+        """Get the squared distance of each point to the nearest of its hinted primitive and the primitives next to it along the Morton curve."""
+        positions = np.searchsorted(self.morton_codes, get_morton_codes(points, self.morton_low, self.morton_high))
+        window = np.clip(positions[:, None] + np.arange(-BRANCHING, BRANCHING), 0, len(self.corners) - 1)
+        if hints is not None:
+            window = np.column_stack([window, np.where(hints >= 0, hints, window[:, 0])])
+        window_points = np.repeat(points, window.shape[1], axis=0)
+        closest = get_closest_points(window_points, self.corners[window.ravel()], self.is_segment[window.ravel()])
+        return ((closest - window_points) ** 2).sum(axis=1).reshape(len(points), -1).min(axis=1)
+
+    def _query_nearest_chunk(
+        self, points: npt.NDArray[np.float64], max_distance: float, split: bool, hints: Optional[npt.NDArray[np.int64]]
+    ):
+        """Descend the hierarchy level by level, dropping nodes farther than the nearest bound of each point."""
+        # a first guess keeps the bound tight from the top levels on
+        upper2 = np.minimum(max_distance ** 2, self._get_guess_distance2(points, hints))
+        # bounds and distances are compared with a rounding tolerance relative to the coordinates
+        tolerance = 1e-9 * max(np.abs(self.node_lows[-1]).max(), np.abs(self.node_highs[-1]).max(), 1.0)
+        pair_points = np.arange(len(points))
+        pair_nodes = np.zeros(len(points), dtype=np.int64)
+        for level in range(len(self.level_starts) - 2, -1, -1):
+            nodes = self.level_starts[level] + pair_nodes
+            lows, highs = self.node_lows[nodes], self.node_highs[nodes]
+            near2 = _get_near_distance2(points[pair_points], lows, highs)
+            if level == 0:
+                # a triangle is at least as far as its plane
+                plane_distances = _dot(self.normals[pair_nodes], points[pair_points] - self.corners[pair_nodes, 0])
+                near2 = np.maximum(near2, plane_distances ** 2)
+            if len(pair_points) > 0:
+                # the first primitive below the nearest box of each point bounds its distance to the nearest face,
+                # pairs stay grouped by point as children replace their parent in place
+                group_starts = np.flatnonzero(np.r_[True, pair_points[1:] != pair_points[:-1]])
+                group_sizes = np.diff(np.r_[group_starts, len(near2)])
+                is_nearest = near2 == np.repeat(np.minimum.reduceat(near2, group_starts), group_sizes)
+                nearest = np.flatnonzero(is_nearest)
+                nearest = nearest[np.r_[True, pair_points[nearest][1:] != pair_points[nearest][:-1]]]
+                nearest_points = pair_points[nearest]
+                primitives = pair_nodes[nearest] * BRANCHING ** level
+                closest = get_closest_points(points[nearest_points], self.corners[primitives], self.is_segment[primitives])
+                upper2[nearest_points] = np.minimum(upper2[nearest_points], ((closest - points[nearest_points]) ** 2).sum(axis=1))
+            keep = near2 <= ((np.sqrt(upper2) + tolerance) ** 2)[pair_points]
+            pair_points, pair_nodes = pair_points[keep], pair_nodes[keep]
+            if level > 0:
+                pair_points, pair_nodes = _get_children(pair_points, pair_nodes, self._get_level_size(level - 1))
+                if split and len(pair_points) > MAX_CANDIDATES:
+                    return None
+
+        primitives = np.full(len(points), -1, dtype=np.int64)
+        distance2 = np.full(len(points), np.inf)
+        closest_points = np.full((len(points), 3), np.nan)
+        if len(pair_points) == 0:
+            return primitives, distance2, closest_points
+        closest = get_closest_points(points[pair_points], self.corners[pair_nodes], self.is_segment[pair_nodes])
+        pair_distance2 = ((closest - points[pair_points]) ** 2).sum(axis=1)
+        # the closest candidate of each point
+        order = np.lexsort((pair_distance2, pair_points))
+        first = order[np.r_[True, pair_points[order][1:] != pair_points[order][:-1]]]
+        first = first[pair_distance2[first] <= max_distance ** 2]
+        primitives[pair_points[first]] = pair_nodes[first]
+        distance2[pair_points[first]] = pair_distance2[first]
+        closest_points[pair_points[first]] = closest[first]
+        return primitives, distance2, closest_points
+
+    def query_boxes(
+        self, lows: npt.NDArray[np.floating], highs: npt.NDArray[np.floating]
+    ) -> Tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+        """
+        Find the marker faces whose bounding box overlaps each axis aligned box [lows[i], highs[i]].
+
+        Returns the faces of box i as face_ids[starts[i]:starts[i + 1]] in ascending order.
+        """
+        lows = np.atleast_2d(np.asarray(lows, dtype=np.float64))
+        highs = np.atleast_2d(np.asarray(highs, dtype=np.float64))
+        if lows.shape[1] == 2:
+            lows = np.column_stack([lows, np.full(len(lows), -np.inf)])
+            highs = np.column_stack([highs, np.full(len(highs), np.inf)])
+
+        keys = []
+        for start in range(0, len(lows), QUERY_CHUNK_SIZE):
+            pair_boxes = np.arange(start, min(start + QUERY_CHUNK_SIZE, len(lows)))
+            pair_nodes = np.zeros(len(pair_boxes), dtype=np.int64)
+            for level in range(len(self.level_starts) - 2, -1, -1):
+                nodes = self.level_starts[level] + pair_nodes
+                overlaps = ((self.node_highs[nodes] >= lows[pair_boxes]) & (self.node_lows[nodes] <= highs[pair_boxes])).all(axis=1)
+                pair_boxes, pair_nodes = pair_boxes[overlaps], pair_nodes[overlaps]
+                if level > 0:
+                    pair_boxes, pair_nodes = _get_children(pair_boxes, pair_nodes, self._get_level_size(level - 1))
+            keys.append(pair_boxes * self.face_count + self.primitive_faces[pair_nodes])
+        keys = np.unique(np.concatenate(keys)) if keys else np.array([], dtype=np.int64)
+        starts = np.searchsorted(keys // self.face_count, np.arange(len(lows) + 1))
+        return starts, keys % self.face_count
+
+    def save(self, file_path: str):
+        """Save the index as an npz file."""
+        with open(file_path, "wb") as file:
+            np.savez(
+                file, marker_tags=np.array(self.marker_tags, dtype=str), face_markers=self.face_markers,
+                face_elements=self.face_elements, corners=self.corners, is_segment=self.is_segment,
+                normals=self.normals, primitive_faces=self.primitive_faces, morton_codes=self.morton_codes,
+                morton_low=self.morton_low, morton_high=self.morton_high, node_lows=self.node_lows,
+                node_highs=self.node_highs, level_starts=self.level_starts, key=self.key,
+            )
+
+    @staticmethod
+    def load(file_path: str) -> "MarkerIndex":
+        """Load an index saved with save."""
+        with np.load(file_path) as data:
+            return MarkerIndex(
+                marker_tags=data["marker_tags"].tolist(), face_markers=data["face_markers"],
+                face_elements=data["face_elements"], corners=data["corners"], is_segment=data["is_segment"],
+                normals=data["normals"], primitive_faces=data["primitive_faces"], morton_codes=data["morton_codes"],
+                morton_low=data["morton_low"], morton_high=data["morton_high"], node_lows=data["node_lows"],
+                node_highs=data["node_highs"], level_starts=data["level_starts"], key=str(data["key"]),
+            )
+
+
+def _get_marker_key(marker_tags: List[str], corners: npt.NDArray[np.float64]) -> str:
+    hasher = hashlib.sha1()
+    hasher.update(repr(marker_tags).encode())
+    hasher.update(memoryview(np.ascontiguousarray(corners)).cast("B"))
+    return hasher.hexdigest()
+
+
+def get_marker_index(mesh: Mesh, cache_path: Optional[str] = None, marker_tags: Optional[List[str]] = None) -> MarkerIndex:
+    """
+    Get the marker index of a mesh, reusing the index cached at cache_path if the marker geometry is unchanged.
+
+    A new or rebuilt index is written to cache_path.
+    """
+    marker_tags = list(mesh.markers) if marker_tags is None else list(marker_tags)
+    primitives = _get_marker_primitives(mesh, marker_tags)
+    key = _get_marker_key(marker_tags, primitives[0])
+    if cache_path is not None and os.path.exists(cache_path):
+        cached = MarkerIndex.load(cache_path)
+        if cached.key == key:
+            return cached
+    marker_index = MarkerIndex._build(marker_tags, *primitives, key=key)
+    if cache_path is not None:
+        marker_index.save(cache_path)
+    return marker_index
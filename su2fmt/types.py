@@ -26,3 +26,14 @@ SU2_TO_VTK_MAPPING = {
 
 # Reverse mapping derived from the forward mapping
 VTK_TO_SU2_MAPPING = {v: k for k, v in SU2_TO_VTK_MAPPING.items()}
+
+# Number of vertices of each SU2 element type
+SU2_ELEMENT_VERTEX_COUNT = {
+    SU2ElementType.LINE.value: 2,
+    SU2ElementType.TRIANGLE.value: 3,
+    SU2ElementType.QUADRILATERAL.value: 4,
+    SU2ElementType.TETRAHEDRON.value: 4,
+    SU2ElementType.HEXAHEDRON.value: 8,
+    SU2ElementType.PRISM.value: 6,
+    SU2ElementType.PYRAMID.value: 5,
+}
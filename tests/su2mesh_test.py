@@ -1,9 +1,14 @@
+import contextlib
+import io
 import unittest
 import numpy as np
 import tempfile
 import os
 from typing import List
-from su2fmt import parse_mesh, export_mesh, SU2ElementType
+from su2fmt import parse_mesh, parse_cell_blocks, read_points, read_elements, load_coordinates, export_mesh, SU2ElementType, CellBlocks
+from su2fmt import cli, diff_meshes, renumber_vertices, get_boundary_faces, check_marker_coverage, add_boundary_marker
+from su2fmt import MarkerIndex, get_marker_index
+from su2fmt import parser
 from meshly import Mesh
 
 
@@ -502,6 +507,611 @@ MARKER_ELEMS= 1
         self.assertEqual(zone2.polygon_count, 1, "Zone 2 should have 1 element")
         self.assertIn('boundary3d', zone2.markers, "Zone 2 should have boundary3d marker")
 
+    def test_boundary_faces_and_marker_coverage(self):
+        """Test boundary face detection against incomplete markers."""
+        mesh_content = """NDIME= 2
+NPOIN= 4
+        0.0000000000        0.0000000000 0
+        1.0000000000        0.0000000000 1
+        1.0000000000        1.0000000000 2
+        0.0000000000        1.0000000000 3
+NELEM= 2
+5 0 1 2 0
+5 0 2 3 1
+NMARK= 2
+MARKER_TAG= wall
+MARKER_ELEMS= 2
+3 0 1
+3 2 3
+MARKER_TAG= inlet
+MARKER_ELEMS= 1
+3 1 2
+"""
+        mesh_file = os.path.join(self.temp_dir, "boundary_mesh.su2")
+        with open(mesh_file, 'w') as f:
+            f.write(mesh_content)
+        mesh = parse_mesh(mesh_file)
+        assert isinstance(mesh, Mesh), "Parsed mesh should be an instance of Mesh"
+
+        # The shared diagonal 0-2 is interior, the 4 square edges are boundary
+        boundary_faces = get_boundary_faces(mesh)
+        self.assertEqual(list(boundary_faces.keys()), [2])
+        self.assertEqual(sorted(map(sorted, boundary_faces[2].tolist())), [[0, 1], [0, 3], [1, 2], [2, 3]])
+
+        coverage = check_marker_coverage(mesh)
+        self.assertFalse(coverage.is_exact)
+        self.assertEqual(coverage.num_boundary_faces, 4)
+        self.assertEqual(sorted(coverage.missing_indices.tolist()), [0, 3])
+        self.assertEqual(coverage.extra_faces, {"wall": 0, "inlet": 0})
+
+        mesh = add_boundary_marker(mesh)
+        self.assertIn("unassigned", mesh.markers)
+        self.assertTrue(check_marker_coverage(mesh).is_exact)
+
+        # Round trip the generated marker through the exporter
+        exported_file = os.path.join(self.temp_dir, "boundary_exported.su2")
+        export_mesh(mesh, exported_file)
+        self.assertTrue(check_marker_coverage(parse_mesh(exported_file)).is_exact)
+
+    def test_volume_boundary_faces(self):
+        """Test boundary faces of two tetrahedra sharing a face."""
+        vertices = np.array([
+            [0.0, 0.0, 0.0],
+            [1.0, 0.0, 0.0],
+            [0.0, 1.0, 0.0],
+            [0.0, 0.0, 1.0],
+            [1.0, 1.0, 1.0]
+        ], dtype=np.float32)
+        mesh = Mesh(
+            vertices=vertices,
+            indices=np.array([0, 1, 2, 3, 1, 2, 3, 4], dtype=np.uint32),
+            cell_types=np.array([SU2ElementType.TETRAHEDRON.value] * 2, dtype=np.uint32),
+            index_sizes=np.array([4, 4], dtype=np.uint32),
+            markers={"wall": [[0, 1, 2], [1, 2, 3]]},
+            dim=3
+        )
+
+        boundary_faces = get_boundary_faces(mesh)
+        self.assertEqual(len(boundary_faces[3]), 6)
+        self.assertNotIn([1, 2, 3], [sorted(face) for face in boundary_faces[3].tolist()])
+
+        coverage = check_marker_coverage(mesh)
+        self.assertEqual(coverage.extra_faces, {"wall": 1})
+        self.assertEqual(len(coverage.missing_sizes), 5)
+
+    def test_parse_cell_blocks(self):
+        """Test parsing cells grouped by element type into VTK arrays."""
+        mesh_content = """NDIME= 3
+NPOIN= 6
+0.0 0.0 0.0 0
+1.0 0.0 0.0 1
+0.0 1.0 0.0 2
+0.0 0.0 1.0 3
+1.0 1.0 1.0 4
+1.0 1.0 0.0 5
+NELEM= 3
+10 0 1 2 3 0
+14 0 1 5 2 4 1
+10 1 2 3 4 2
+NMARK= 1
+MARKER_TAG= wall
+MARKER_ELEMS= 2
+9 0 1 5 2
+5 0 1 3
+"""
+        mesh_file = os.path.join(self.temp_dir, "cell_blocks_mesh.su2")
+        with open(mesh_file, 'w') as f:
+            f.write(mesh_content)
+
+        cell_blocks = parse_cell_blocks(mesh_file)
+        assert isinstance(cell_blocks, CellBlocks), "Parsed cell blocks should be an instance of CellBlocks"
+        self.assertEqual(list(cell_blocks.blocks.keys()), [SU2ElementType.TETRAHEDRON, SU2ElementType.PYRAMID])
+        np.testing.assert_array_equal(cell_blocks.blocks[SU2ElementType.TETRAHEDRON], [[0, 1, 2, 3], [1, 2, 3, 4]])
+        np.testing.assert_array_equal(cell_blocks.blocks[SU2ElementType.PYRAMID], [[0, 1, 5, 2, 4]])
+        np.testing.assert_array_equal(cell_blocks.cell_ids, [0, 2, 1])
+        self.assertEqual(cell_blocks.cell_ids.dtype, np.int32)
+        for block in cell_blocks.blocks.values():
+            self.assertTrue(np.shares_memory(block, cell_blocks.connectivity))
+
+        offsets, connectivity, cell_types = cell_blocks.to_vtk()
+        self.assertTrue(np.shares_memory(connectivity, cell_blocks.connectivity))
+        self.assertEqual((offsets.dtype, connectivity.dtype), (np.int32, np.int32))
+        np.testing.assert_array_equal(offsets, [0, 4, 8, 13])
+        np.testing.assert_array_equal(cell_types, [10, 10, 14])
+        self.assertEqual([cell_type for cell_type, _ in cell_blocks.to_meshio_cells()], ["tetra", "pyramid"])
+        self.assertEqual(list(cell_blocks.markers["wall"].keys()), [SU2ElementType.TRIANGLE, SU2ElementType.QUADRILATERAL])
+
+        # Converting back restores the file order of the parsed mesh
+        mesh = parse_mesh(mesh_file)
+        assert isinstance(mesh, Mesh), "Parsed mesh should be an instance of Mesh"
+        converted = cell_blocks.to_mesh()
+        np.testing.assert_array_equal(converted.indices, mesh.indices)
+        np.testing.assert_array_equal(converted.cell_types, mesh.cell_types)
+        np.testing.assert_array_equal(CellBlocks.from_mesh(mesh).connectivity, cell_blocks.connectivity)
+
+        # Mixed types are grouped while parsing, also across chunks
+        zone = parser.parse_zones(mesh_file, group_types=True)[1][0]
+        np.testing.assert_array_equal(zone.elements.indices, cell_blocks.connectivity)
+        np.testing.assert_array_equal(zone.elements.get_indices(), mesh.indices)
+        chunk_size = parser.PARSE_CHUNK_SIZE
+        parser.PARSE_CHUNK_SIZE = 2
+        try:
+            chunked = parse_cell_blocks(mesh_file)
+        finally:
+            parser.PARSE_CHUNK_SIZE = chunk_size
+        assert isinstance(chunked, CellBlocks), "Parsed cell blocks should be an instance of CellBlocks"
+        np.testing.assert_array_equal(chunked.connectivity, cell_blocks.connectivity)
+        np.testing.assert_array_equal(chunked.cell_ids, cell_blocks.cell_ids)
+
+        # uint64 indices beyond uint32 can not be converted to a meshly.Mesh
+        wide = CellBlocks.from_mesh(mesh)
+        wide.connectivity = wide.connectivity.astype(np.uint64)
+        wide.connectivity[-1] = 2**32 + 5
+        with self.assertRaises(ValueError):
+            wide.to_mesh()
+
+        # Cells sorted by type keep the file order without cell ids
+        with open(mesh_file, 'w') as f:
+            f.write(mesh_content.replace("14 0 1 5 2 4 1\n10 1 2 3 4 2\n", "10 1 2 3 4 2\n14 0 1 5 2 4 1\n"))
+        sorted_blocks = parse_cell_blocks(mesh_file)
+        assert isinstance(sorted_blocks, CellBlocks), "Parsed cell blocks should be an instance of CellBlocks"
+        self.assertIsNone(sorted_blocks.cell_ids)
+        np.testing.assert_array_equal(sorted_blocks.get_cell_ids(), [0, 1, 2])
+        np.testing.assert_array_equal(sorted_blocks.connectivity, cell_blocks.connectivity)
+        np.testing.assert_array_equal(sorted_blocks.to_mesh().indices, cell_blocks.connectivity)
+        self.assertIsNone(CellBlocks.from_mesh(sorted_blocks.to_mesh()).cell_ids)
+
+    def test_incremental_export_and_diff(self):
+        """Test that incremental exports only replace the points of an unchanged topology."""
+        vertices = np.array([
+            [0.0, 0.0, 0.0],
+            [1.0, 0.0, 0.0],
+            [0.0, 1.0, 0.0],
+            [0.0, 0.0, 1.0]
+        ], dtype=np.float32)
+        mesh = Mesh(
+            vertices=vertices,
+            indices=np.array([0, 1, 2, 3], dtype=np.uint32),
+            cell_types=np.array([SU2ElementType.TETRAHEDRON.value], dtype=np.uint32),
+            index_sizes=np.array([4], dtype=np.uint32),
+            markers={"wall": [[0, 1, 2]]},
+            dim=3
+        )
+        mesh_file = os.path.join(self.temp_dir, "incremental.su2")
+        export_mesh(mesh, mesh_file, incremental=True)
+        with open(mesh_file, 'r') as f:
+            original_lines = f.read().splitlines()
+
+        deformed = Mesh(
+            vertices=vertices * 1.5,
+            indices=mesh.indices,
+            cell_types=mesh.cell_types,
+            index_sizes=mesh.index_sizes,
+            markers={"wall": [[0, 1, 2]]},
+            dim=3
+        )
+        diff = diff_meshes(mesh, deformed)
+        self.assertFalse(diff.topology_changed)
+        assert diff.moved_vertices is not None
+        np.testing.assert_array_equal(diff.moved_vertices, [1, 2, 3])
+        self.assertAlmostEqual(diff.max_displacement, 0.5)
+
+        export_mesh(deformed, mesh_file, incremental=True)
+        with open(mesh_file, 'r') as f:
+            lines = f.read().splitlines()
+        # Only the point lines differ
+        changed = [i for i, (a, b) in enumerate(zip(original_lines, lines)) if a != b]
+        self.assertEqual(len(lines), len(original_lines))
+        self.assertEqual(changed, [4, 5, 6])
+
+        reparsed = parse_mesh(mesh_file)
+        assert isinstance(reparsed, Mesh), "Parsed mesh should be an instance of Mesh"
+        np.testing.assert_allclose(reparsed.vertices, deformed.vertices)
+        self.assertTrue(diff_meshes(deformed, reparsed).is_identical)
+
+        # A topology change rewrites the whole file
+        renamed = Mesh(
+            vertices=vertices,
+            indices=mesh.indices,
+            cell_types=mesh.cell_types,
+            index_sizes=mesh.index_sizes,
+            markers={"inlet": [[0, 1, 2]]},
+            dim=3
+        )
+        diff = diff_meshes(deformed, renamed)
+        self.assertEqual((diff.markers_added, diff.markers_removed), (["inlet"], ["wall"]))
+        export_mesh(renamed, mesh_file, incremental=True)
+        reparsed = parse_mesh(mesh_file)
+        assert isinstance(reparsed, Mesh), "Parsed mesh should be an instance of Mesh"
+        self.assertEqual(list(reparsed.markers.keys()), ["inlet"])
+        np.testing.assert_allclose(reparsed.vertices, vertices)
+
+    def test_fixed_width_export(self):
+        """Test fixed width export, parsing and random access."""
+        vertices = np.array([
+            [0.0, 0.0, 0.0],
+            [1.0, 0.0, 0.0],
+            [0.0, 1.0, 0.0],
+            [0.0, 0.0, 1.0],
+            [1.0, 1.0, 1.0],
+            [-1.5e-7, 1.0, 0.0]
+        ], dtype=np.float32)
+        mesh = Mesh(
+            vertices=vertices,
+            indices=np.array([0, 1, 2, 3, 0, 1, 5, 2, 4, 1, 2, 3, 4], dtype=np.uint32),
+            index_sizes=np.array([4, 5, 4], dtype=np.uint32),
+            cell_types=np.array([
+                SU2ElementType.TETRAHEDRON.value,
+                SU2ElementType.PYRAMID.value,
+                SU2ElementType.TETRAHEDRON.value
+            ], dtype=np.uint32),
+            markers={"wall": [[0, 1, 5, 2], [0, 1, 3]]},
+            dim=3
+        )
+        mesh_file = os.path.join(self.temp_dir, "fixed_width.su2")
+        export_mesh(mesh, mesh_file, fixed_width=True)
+
+        with open(mesh_file, 'r') as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines[0], "% FIXED_WIDTH")
+        point_lines = lines[3:9]
+        element_lines = lines[10:13]
+        self.assertEqual(len(set(map(len, point_lines))), 1)
+        self.assertEqual(len(set(map(len, element_lines))), 1)
+
+        parsed = parse_mesh(mesh_file)
+        assert isinstance(parsed, Mesh), "Parsed mesh should be an instance of Mesh"
+        np.testing.assert_array_equal(parsed.vertices, mesh.vertices)
+        np.testing.assert_array_equal(parsed.indices, mesh.indices)
+        np.testing.assert_array_equal(parsed.cell_types, mesh.cell_types)
+        np.testing.assert_array_equal(parsed.markers["wall"], mesh.markers["wall"])
+        np.testing.assert_array_equal(parsed.marker_cell_types["wall"], mesh.marker_cell_types["wall"])
+
+        np.testing.assert_array_equal(read_points(mesh_file, 4, 6).astype(np.float32), vertices[4:6])
+        elements = read_elements(mesh_file, 1, 3)
+        np.testing.assert_array_equal(elements.types, [SU2ElementType.PYRAMID.value, SU2ElementType.TETRAHEDRON.value])
+        np.testing.assert_array_equal(elements.get_indices(), [0, 1, 5, 2, 4, 1, 2, 3, 4])
+
+        # Incremental exports overwrite the fixed width points in place
+        export_mesh(mesh, mesh_file, incremental=True, fixed_width=True)
+        size = os.path.getsize(mesh_file)
+        moved = Mesh(vertices=vertices + 0.25, indices=mesh.indices, index_sizes=mesh.index_sizes,
+                     cell_types=mesh.cell_types, markers={"wall": [[0, 1, 5, 2], [0, 1, 3]]}, dim=3)
+        export_mesh(moved, mesh_file, incremental=True, fixed_width=True)
+        self.assertEqual(os.path.getsize(mesh_file), size)
+        np.testing.assert_allclose(read_points(mesh_file), vertices + 0.25)
+
+        # Variable width sections that happen to add up to whole records are not seeked into
+        mesh_content = """NDIME= 2
+NPOIN= 4
+1.0 2.0 0
+5 6.0 1
+7.00 8.00 2
+3.0 4.0 3
+NELEM= 1
+9 0 1 2 3 0
+"""
+        with open(mesh_file, 'w') as f:
+            f.write(mesh_content)
+        np.testing.assert_array_equal(read_points(mesh_file, 2)[:, :2], [[7.0, 8.0], [3.0, 4.0]])
+
+        # Lines of equal length with different value counts are only parsed per record in fixed width files
+        mesh_content = """NDIME= 2
+NPOIN= 3
+1.0 2.0 0
+1.0 22.00
+1 2 3 4.0
+NELEM= 1
+5 0 1 2
+"""
+        with open(mesh_file, 'w') as f:
+            f.write(mesh_content)
+        np.testing.assert_array_equal(read_points(mesh_file)[:, :2], [[1.0, 2.0], [1.0, 22.0], [1.0, 2.0]])
+        parsed = parse_mesh(mesh_file)
+        assert isinstance(parsed, Mesh), "Parsed mesh should be an instance of Mesh"
+        np.testing.assert_array_equal(parsed.vertices[:, :2], [[1.0, 2.0], [1.0, 22.0], [1.0, 2.0]])
+
+    def test_load_coordinates(self):
+        """Test reloading only the coordinates of a SU2 output mesh into a parsed mesh."""
+        mesh_content = """NDIME= 2
+NELEM= 2
+5 0 1 2 0
+5 0 2 3 1
+NPOIN= 4
+0.0 0.0 0
+1.0 0.0 1
+1.0 1.0 2
+0.0 1.0 3
+NMARK= 1
+MARKER_TAG= wall
+MARKER_ELEMS= 1
+3 0 1
+"""
+        mesh_file = os.path.join(self.temp_dir, "mesh.su2")
+        with open(mesh_file, 'w') as f:
+            f.write(mesh_content)
+        mesh = parse_mesh(mesh_file)
+        assert isinstance(mesh, Mesh), "Parsed mesh should be an instance of Mesh"
+        vertices = mesh.vertices
+
+        deformed_file = os.path.join(self.temp_dir, "mesh_out.su2")
+        with open(deformed_file, 'w') as f:
+            f.write(mesh_content.replace("1.0 1.0 2", "1.5 1.25 2"))
+        self.assertIs(load_coordinates(deformed_file, into=mesh), mesh)
+        self.assertIs(mesh.vertices, vertices)
+        np.testing.assert_allclose(mesh.vertices[2], [1.5, 1.25, 0.0])
+        np.testing.assert_allclose(mesh.vertices[[0, 1, 3]], [[0, 0, 0], [1, 0, 0], [0, 1, 0]])
+
+        # Point counts have to match
+        with open(deformed_file, 'w') as f:
+            f.write(mesh_content.replace("NPOIN= 4", "NPOIN= 3").replace("0.0 1.0 3\n", ""))
+        with self.assertRaises(ValueError):
+            load_coordinates(deformed_file, into=mesh)
+
+    def test_index_dtypes(self):
+        """Test that indices use the smallest index dtype and chunked parsing matches block parsing."""
+        self.assertEqual(parser.get_index_dtype(2**32), np.uint32)
+        self.assertEqual(parser.get_index_dtype(2**32 + 1), np.uint64)
+        self.assertEqual(parser.get_index_dtype(None), np.uint32)
+
+        mesh_content = """NDIME= 2
+NELEM= 3
+5 0 1 2 0
+9 0 2 3 4 1
+5 3 4 5 2
+NPOIN= 6
+0.0 0.0 0
+1.0 0.0 1
+1.0 1.0 2
+0.0 1.0 3
+0.0 2.0 4
+1.0 2.0 5
+NMARK= 1
+MARKER_TAG= wall
+MARKER_ELEMS= 2
+3 0 1
+3 4 5
+"""
+        mesh_file = os.path.join(self.temp_dir, "dtype_mesh.su2")
+        with open(mesh_file, 'w') as f:
+            f.write(mesh_content)
+        zones = parser.parse_zones(mesh_file)[1]
+        self.assertEqual(zones[0].elements.indices.dtype, np.uint32)
+        self.assertEqual(zones[0].elements.types.dtype, np.uint8)
+        self.assertEqual(zones[0].markers["wall"].indices.dtype, np.uint32)
+
+        # Sections spanning several chunks give the same result
+        chunk_size = parser.PARSE_CHUNK_SIZE
+        parser.PARSE_CHUNK_SIZE = 2
+        try:
+            chunked = parse_mesh(mesh_file)
+        finally:
+            parser.PARSE_CHUNK_SIZE = chunk_size
+        mesh = parse_mesh(mesh_file)
+        assert isinstance(mesh, Mesh) and isinstance(chunked, Mesh), "Parsed meshes should be instances of Mesh"
+        np.testing.assert_array_equal(chunked.indices, [0, 1, 2, 0, 2, 3, 4, 3, 4, 5])
+        np.testing.assert_array_equal(chunked.indices, mesh.indices)
+        np.testing.assert_array_equal(chunked.vertices, mesh.vertices)
+        np.testing.assert_array_equal(chunked.markers["wall"], mesh.markers["wall"])
+
+        # Indices beyond NPOIN are rejected
+        with open(mesh_file, 'w') as f:
+            f.write(mesh_content.replace("5 3 4 5 2", "5 3 4 6 2"))
+        with self.assertRaises(ValueError):
+            parse_mesh(mesh_file)
+
+    def test_marker_index(self):
+        """Test nearest face and box queries of the marker spatial index against known distances."""
+        mesh_content = """NDIME= 3
+NPOIN= 8
+0.0 0.0 0.0 0
+1.0 0.0 0.0 1
+1.0 1.0 0.0 2
+0.0 1.0 0.0 3
+0.0 0.0 1.0 4
+1.0 0.0 1.0 5
+1.0 1.0 1.0 6
+0.0 1.0 1.0 7
+NELEM= 1
+12 0 1 2 3 4 5 6 7 0
+NMARK= 2
+MARKER_TAG= bottom
+MARKER_ELEMS= 1
+9 0 3 2 1
+MARKER_TAG= top
+MARKER_ELEMS= 2
+5 4 5 6
+5 4 6 7
+"""
+        mesh_file = os.path.join(self.temp_dir, "index_mesh.su2")
+        with open(mesh_file, 'w') as f:
+            f.write(mesh_content)
+        mesh = parse_mesh(mesh_file)
+        assert isinstance(mesh, Mesh), "Parsed mesh should be an instance of Mesh"
+
+        marker_index = MarkerIndex.from_mesh(mesh)
+        self.assertEqual(marker_index.face_count, 3)
+        points = np.array([[0.5, 0.5, 0.2], [0.25, 0.75, 0.9], [0.5, 0.5, -1.0], [2.0, 0.5, 1.5]])
+        nearest = marker_index.query_nearest(points)
+        np.testing.assert_allclose(nearest.distances, [0.2, 0.1, 1.0, np.sqrt(1.25)])
+        np.testing.assert_allclose(nearest.closest_points[[0, 2, 3]], [[0.5, 0.5, 0.0], [0.5, 0.5, 0.0], [1.0, 0.5, 1.0]])
+        self.assertEqual([marker_index.marker_tags[marker_index.face_markers[face_id]] for face_id in nearest.face_ids], ["bottom", "top", "bottom", "top"])
+        self.assertEqual(marker_index.face_elements[nearest.face_ids[1]], 1)
+
+        # Points beyond the maximum distance have no nearest face
+        limited = marker_index.query_nearest(points, max_distance=0.5)
+        np.testing.assert_array_equal(limited.face_ids[2:], [-1, -1])
+        self.assertTrue(np.isinf(limited.distances[2:]).all())
+
+        starts, face_ids = marker_index.query_boxes(np.array([[0.4, 0.4, -0.1], [5.0, 5.0, 5.0]]), np.array([[0.6, 0.6, 0.1], [6.0, 6.0, 6.0]]))
+        np.testing.assert_array_equal(starts, [0, 1, 1])
+        np.testing.assert_array_equal(face_ids, [0])
+
+        # Planar markers are indexed as segments
+        square = Mesh(
+            vertices=np.array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0]], dtype=np.float32),
+            indices=np.array([0, 1, 2, 0, 2, 3], dtype=np.uint32),
+            index_sizes=np.array([3, 3], dtype=np.uint32),
+            cell_types=np.array([5, 5], dtype=np.uint8),
+            markers={"wall": np.array([0, 1, 1, 2], dtype=np.uint32)},
+            marker_sizes={"wall": np.array([2, 2], dtype=np.uint32)},
+            marker_cell_types={"wall": np.array([3, 3], dtype=np.uint8)},
+            dim=2,
+        )
+        planar = MarkerIndex.from_mesh(square).query_nearest(np.array([[0.5, 0.3], [0.2, 0.6], [1.5, 2.0]]))
+        np.testing.assert_allclose(planar.distances, [0.3, 0.6, np.sqrt(1.25)])
+        np.testing.assert_array_equal(planar.face_ids, [0, 0, 1])
+
+        # Collapsed quads split into a zero area triangle are still found
+        collapsed = Mesh(
+            vertices=np.array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0], [2, 0, 0], [2, 1, 0]], dtype=np.float32),
+            indices=np.array([0, 1, 2, 3], dtype=np.uint32),
+            index_sizes=np.array([4], dtype=np.uint32),
+            cell_types=np.array([9], dtype=np.uint8),
+            markers={"wall": np.array([0, 0, 2, 3, 1, 4, 5, 2], dtype=np.uint32)},
+            marker_sizes={"wall": np.array([4, 4], dtype=np.uint32)},
+            marker_cell_types={"wall": np.array([9, 9], dtype=np.uint8)},
+            dim=3,
+        )
+        collapsed_points = np.array([[0.25, 0.75, 0.5], [0.6, 0.4, 0.5], [0.5, 0.5, -1.0], [1.5, 0.5, 0.1]])
+        collapsed_nearest = MarkerIndex.from_mesh(collapsed).query_nearest(collapsed_points)
+        np.testing.assert_allclose(collapsed_nearest.distances, [0.5, np.sqrt(0.27), 1.0, 0.1])
+        np.testing.assert_array_equal(collapsed_nearest.face_ids, [0, 0, 0, 1])
+        np.testing.assert_allclose(collapsed_nearest.closest_points[1], [0.5, 0.5, 0.0])
+
+        # Cached indexes are reused until the marker geometry changes
+        cache_path = os.path.join(self.temp_dir, "index.npz")
+        cached = get_marker_index(mesh, cache_path)
+        self.assertTrue(os.path.exists(cache_path))
+        self.assertEqual(get_marker_index(mesh, cache_path).key, cached.key)
+        np.testing.assert_allclose(get_marker_index(mesh, cache_path).query_nearest(points).distances, nearest.distances)
+        mesh.vertices[4:, 2] = 2.0
+        moved = get_marker_index(mesh, cache_path)
+        self.assertNotEqual(moved.key, cached.key)
+        self.assertAlmostEqual(moved.query_nearest(points[1:2]).distances[0], 0.9)
+
+    def test_comments_and_blank_lines(self):
+        """Test that comments and blank lines inside sections are skipped and errors report file lines."""
+        mesh_content = """% generated mesh
+NDIME= 2
+NELEM= 3
+5 0 1 2 0
+% second element
+
+9 0 2 3 4 1   % quad
+5 3 4 5 2
+NPOIN= 6
+0.0 0.0 0
+1.0 0.0 1
+   
+1.0 1.0 2
+0.0 1.0 3 % top left
+0.0 2.0 4
+1.0 2.0 5
+NMARK= 1
+MARKER_TAG= wall % no slip
+MARKER_ELEMS= 2 % lines
+% wall lines
+3 0 1
+3 4 5
+"""
+        mesh_file = os.path.join(self.temp_dir, "comment_mesh.su2")
+        with open(mesh_file, 'w') as f:
+            f.write(mesh_content)
+        mesh = parse_mesh(mesh_file)
+        assert isinstance(mesh, Mesh), "Parsed mesh should be an instance of Mesh"
+        np.testing.assert_array_equal(mesh.indices, [0, 1, 2, 0, 2, 3, 4, 3, 4, 5])
+        np.testing.assert_array_equal(mesh.vertices[:, 1], [0.0, 0.0, 1.0, 1.0, 2.0, 2.0])
+        self.assertEqual(list(mesh.markers.keys()), ["wall"])
+        np.testing.assert_array_equal(mesh.markers["wall"], [0, 1, 4, 5])
+        np.testing.assert_array_equal(read_points(mesh_file, 3, 5)[:, 1], [1.0, 2.0])
+
+        # Chunks with and without comments give the same result
+        chunk_size = parser.PARSE_CHUNK_SIZE
+        parser.PARSE_CHUNK_SIZE = 2
+        try:
+            chunked = parse_mesh(mesh_file)
+        finally:
+            parser.PARSE_CHUNK_SIZE = chunk_size
+        assert isinstance(chunked, Mesh), "Parsed mesh should be an instance of Mesh"
+        np.testing.assert_array_equal(chunked.indices, mesh.indices)
+        np.testing.assert_array_equal(chunked.vertices, mesh.vertices)
+
+        # Errors report the line in the file, also across chunks
+        for old, new, line in [
+            ("5 3 4 5 2", "7 3 4 5 2", 8),
+            ("0.0 2.0 4", "0.0 x 4", 15),
+            ("3 4 5\n", "3 4\n", 22),
+            ("NPOIN= 6", "NPOIN= four", 9),
+            ("9 0 2 3 4 1", "9 0 2 -3 4 1", 7),
+            ("5 3 4 5 2", "5 3 4 9 2", 8),
+            ("3 4 5\n", "3 4 6\n", 22),
+        ]:
+            with open(mesh_file, 'w') as f:
+                f.write(mesh_content.replace(old, new))
+            for parse_chunk_size in [chunk_size, 2]:
+                parser.PARSE_CHUNK_SIZE = parse_chunk_size
+                try:
+                    with self.assertRaisesRegex(ValueError, f"Line {line}: {new.strip()}"):
+                        parse_mesh(mesh_file)
+                finally:
+                    parser.PARSE_CHUNK_SIZE = chunk_size
+
+    def test_command_line(self):
+        """Test converting, renumbering and inspecting meshes through the command line tool."""
+        mesh_content = """NDIME= 2
+NPOIN= 4
+0.0 0.0 0
+1.0 0.0 1
+1.0 1.0 2
+0.0 1.0 3
+NELEM= 2
+5 2 3 0 0
+5 0 1 2 1
+NMARK= 1
+MARKER_TAG= wall
+MARKER_ELEMS= 2
+3 0 1
+3 2 3
+"""
+        mesh_file = os.path.join(self.temp_dir, "cli.su2")
+        with open(mesh_file, 'w') as f:
+            f.write(mesh_content)
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.assertEqual(cli.main(["convert", "--to", "su2.gz", mesh_file]), 0)
+            self.assertEqual(cli.main(["convert", "--to", "zip", mesh_file + ".gz"]), 0)
+            self.assertEqual(cli.main(["renumber", mesh_file]), 0)
+            self.assertEqual(cli.main(["info", os.path.join(self.temp_dir, "cli.zip")]), 0)
+            self.assertEqual(cli.main(["convert", "--to", "su2", mesh_file]), 1)
+        self.assertIn("NPOIN= 4 NELEM= 2 (TRIANGLE: 2)", output.getvalue())
+        self.assertIn("would overwrite the input", output.getvalue())
+
+        # The peak memory of a file does not include earlier, larger files
+        np.ones(1 << 25).sum()
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.assertEqual(cli.main(["info", mesh_file, mesh_file]), 0)
+        peaks = [float(line.split("peak RSS ")[1].split()[0]) * 2**20 for line in output.getvalue().splitlines() if "peak RSS" in line]
+        self.assertEqual(len(peaks), 2)
+        if cli.get_peak_rss() > 0:
+            self.assertLess(max(peaks), cli.get_peak_rss() - (1 << 27))
+
+        compressed = parse_mesh(mesh_file + ".gz")
+        assert isinstance(compressed, Mesh), "Parsed mesh should be an instance of Mesh"
+        np.testing.assert_array_equal(compressed.indices, [2, 3, 0, 0, 1, 2])
+
+        # First touch renumbering follows the element order and keeps the geometry
+        renumbered = parse_mesh(os.path.join(self.temp_dir, "cli_renumbered.su2"))
+        assert isinstance(renumbered, Mesh), "Parsed mesh should be an instance of Mesh"
+        np.testing.assert_array_equal(renumbered.indices, [0, 1, 2, 2, 3, 0])
+        np.testing.assert_array_equal(renumbered.vertices[renumbered.indices], compressed.vertices[compressed.indices])
+        np.testing.assert_array_equal(renumbered.markers["wall"], [2, 3, 0, 1])
+
+        morton = renumber_vertices(compressed, "morton")
+        np.testing.assert_array_equal(morton.vertices[morton.indices], compressed.vertices[compressed.indices])
+
 
 if __name__ == '__main__':
     unittest.main()